@@ -0,0 +1,220 @@
+import os
+import re
+import json
+import time
+import logging
+import multiprocessing
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import charts
+import utils
+import llm
+import profiling
+
+logger = logging.getLogger(__name__)
+
+
+def default_workers():
+    """Return the default number of worker processes for bulk generation"""
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def log_notify(level, message, comments=None):
+    """
+    Report a message of the PDF builder through logging.
+
+    Used instead of the Streamlit messages outside the dashboard; being a
+    module-level function it can be sent to worker processes.
+    """
+    logger.log(logging.ERROR if level == "error" else logging.INFO, message)
+
+
+def _generate_pdf_worker(docente, docente_rows, docente_data, subject_index=None, summaries=None,
+                         notify=None, chart_backend=charts.DEFAULT_BACKEND):
+    """Build one teacher's PDF inside a worker process, return (docente, pdf, timings)"""
+    # ReportLab and matplotlib are only needed where reports are rendered
+    import report_builder
+
+    start = time.perf_counter()
+    timer = profiling.StageTimer()
+    if subject_index is None:
+        with timer.span("index"):
+            subject_index = utils.SubjectIndex(docente_rows)
+    pdf_bytes = report_builder.build_teacher_report(
+        docente, docente_data, subject_index, summaries, notify, timer=timer,
+        chart_backend=chart_backend)
+    timings = {"total": round(time.perf_counter() - start, 6), "stages": timer.summary()}
+    return docente, pdf_bytes, timings
+
+
+def _log_timings(docente, pdf_bytes, timings):
+    """Log the timing summary of one report as a JSON record"""
+    record = {"event": "report", "docente": str(docente), "ok": pdf_bytes is not None}
+    record.update(timings)
+    logger.info(json.dumps(record, ensure_ascii=False))
+
+
+def report_filename(docente):
+    """Return the PDF file name of a teacher's report, safe on any platform"""
+    name = re.sub(r'[\\/:*?"<>|\s]+', '_', str(docente)).strip('._')
+    return f"{name or 'docente'}_report.pdf"
+
+
+def _docente_summaries(summaries, docente):
+    """Return the summaries of one teacher's subjects"""
+    return {key: summary for key, summary in summaries.items() if key[0] == docente}
+
+
+def iter_pdf_reports(data, data_q2, docentes, max_workers=None, progress_callback=None,
+                     subject_index=None, summaries=None, notify=None, timings_callback=None,
+                     chart_backend=charts.DEFAULT_BACKEND):
+    """
+    Generate the PDF report of every teacher, spreading them across processes.
+
+    Reports are yielded as (docente, pdf_bytes) pairs as soon as each one is
+    ready, in completion order, so callers can write them out without holding
+    the whole batch in memory. pdf_bytes is None when generation failed,
+    including for teachers without any rating in `data_q2`.
+
+    Parameters:
+    -----------
+    data : pandas.DataFrame
+        Processed survey rows (output of utils.process_columns)
+    data_q2 : pandas.DataFrame
+        Rating summary (output of utils.analyze_data_q2)
+    docentes : list
+        Teachers to generate reports for
+    max_workers : int
+        Number of worker processes. 1 runs everything in this process.
+    progress_callback : callable
+        Called as progress_callback(done, total, docente) after each report
+    subject_index : utils.SubjectIndex
+        Prebuilt index of `data`; built here when not given
+    summaries : dict
+        Comment summaries as returned by llm.summarize_all. When not given,
+        every subject is summarized concurrently before rendering starts, so
+        the LLM concurrency limit applies to the whole batch. Subjects
+        missing from the dict are rendered without a summary.
+    notify : callable
+        Receives the builder's messages as notify(level, message, comments);
+        they are dropped when not given. With several workers it must be
+        picklable, e.g. log_notify.
+    timings_callback : callable
+        Called as timings_callback(docente, timings) after each report, with
+        {'total': seconds, 'stages': {stage: (seconds, calls)}}. The same
+        timings are always logged as one JSON record per report.
+    chart_backend : str
+        How the charts are drawn, one of charts.CHART_BACKENDS
+    """
+    if max_workers is None:
+        max_workers = default_workers()
+
+    total = len(docentes)
+
+    if subject_index is None:
+        subject_index = utils.SubjectIndex(data)
+
+    if summaries is None:
+        wanted = set(docentes)
+        keys = [key for key in data_q2.index if key[0] in wanted]
+        summaries = llm.summarize_all(llm.collect_comment_batches(subject_index, keys))
+
+    # Each worker only needs its own rows, so ship the teacher's slice of the
+    # index instead of pickling the whole export for every teacher
+    summary_by_docente = dict(
+        tuple(data_q2.groupby(level=0, sort=False, observed=True)))
+
+    # Teachers without ratings have no report to build: they fail right away
+    done = 0
+    for docente in docentes:
+        if docente not in summary_by_docente:
+            done += 1
+            message = f"No ratings found for {docente}, report not generated."
+            if notify:
+                notify("error", message)
+            else:
+                logger.error(message)
+            yield docente, None
+            if progress_callback:
+                progress_callback(done, total, docente)
+    docentes = [docente for docente in docentes if docente in summary_by_docente]
+    if not docentes:
+        return
+
+    if max_workers <= 1 or len(docentes) <= 1:
+        for done, docente in enumerate(docentes, start=done + 1):
+            _, pdf_bytes, timings = _generate_pdf_worker(
+                docente, subject_index.docente_rows(docente),
+                summary_by_docente[docente], subject_index, summaries, notify, chart_backend)
+            _log_timings(docente, pdf_bytes, timings)
+            if timings_callback:
+                timings_callback(docente, timings)
+            yield docente, pdf_bytes
+            if progress_callback:
+                progress_callback(done, total, docente)
+    else:
+        # Spawn instead of fork: the Streamlit server is multi-threaded
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(docentes)),
+                                 mp_context=context) as executor:
+            # No list of the futures is kept: as_completed drops each one
+            # once it is yielded, releasing its PDF with it
+            futures = as_completed(
+                executor.submit(_generate_pdf_worker, docente,
+                                subject_index.docente_rows(docente), summary_by_docente[docente],
+                                None, _docente_summaries(summaries, docente), notify,
+                                chart_backend)
+                for docente in docentes
+            )
+            for done, future in enumerate(futures, start=done + 1):
+                docente, pdf_bytes, timings = future.result()
+                _log_timings(docente, pdf_bytes, timings)
+                if timings_callback:
+                    timings_callback(docente, timings)
+                yield docente, pdf_bytes
+                if progress_callback:
+                    progress_callback(done, total, docente)
+
+
+def generate_all_pdf_reports(data, data_q2, docentes, max_workers=None, progress_callback=None,
+                             subject_index=None, summaries=None, notify=None,
+                             timings_callback=None, chart_backend=charts.DEFAULT_BACKEND):
+    """
+    Generate the PDF report of every teacher, see iter_pdf_reports.
+
+    Returns:
+    --------
+    dict
+        Mapping of docente to PDF bytes (None when generation failed), in the
+        same order as `docentes`
+    """
+    results = dict(iter_pdf_reports(data, data_q2, docentes, max_workers, progress_callback,
+                                    subject_index, summaries, notify, timings_callback,
+                                    chart_backend))
+    return {docente: results.get(docente) for docente in docentes}
+
+
+def write_reports_zip(reports, fileobj):
+    """
+    Write (docente, pdf_bytes) pairs into a ZIP archive as they arrive.
+
+    Parameters:
+    -----------
+    reports : iterable
+        (docente, pdf_bytes) pairs, e.g. from iter_pdf_reports
+    fileobj : str or file-like
+        Path or seekable binary file the archive is written to
+
+    Returns:
+    --------
+    list
+        Teachers whose report could not be generated
+    """
+    failed = []
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for docente, pdf_bytes in reports:
+            if pdf_bytes is None:
+                failed.append(docente)
+            else:
+                archive.writestr(report_filename(docente), pdf_bytes)
+    return failed
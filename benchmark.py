@@ -0,0 +1,715 @@
+"""
+Benchmarks for the report pipeline on synthetic survey exports.
+
+Usage:
+    python benchmark.py                 # same as: python benchmark.py check
+    python benchmark.py analyze --rows 10000 100000 1000000
+    python benchmark.py charts --docentes 5
+    python benchmark.py imports --modules report cli batch
+    python benchmark.py pipeline --docentes 20 --subjects 3 --responses 30 --output bench.json
+    python benchmark.py header --pages 24 --documents 5
+    python benchmark.py memory --rows 1000000
+    python benchmark.py summarize --comments 200 2000 --token-latency 0.002
+    python benchmark.py comments --rows 100000 --stock-share 0.5
+    python benchmark.py vector --docentes 5
+    python benchmark.py faculty --rows 100000 1000000
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+import utils
+
+RATINGS = ["Excelente", "Bueno", "Regular", "Deficiente", "Insuficiente"]
+RATING_WEIGHTS = [0.55, 0.3, 0.1, 0.03, 0.02]
+PLAN_RESPONSES = ["Si", "No", "Desconozco"]
+PLAN_WEIGHTS = [0.9, 0.04, 0.06]
+COMMENT_WORDS = [
+    "buen", "docente", "explica", "clases", "claras", "dinámicas", "mejorar",
+    "puntualidad", "ejemplos", "prácticos", "retroalimentación", "tareas",
+    "excelente", "paciencia", "materia", "ninguno", "todo", "bien",
+]
+# Short answers students give over and over, with their usual variations
+STOCK_COMMENTS = [
+    "Ninguno", "ninguno.", "NINGUNO", ".", "", " ", "Nada", "ok", "Sin comentarios",
+    "Todo bien", "todo bien.", "Todo  bien", "Excelente docente", "excelente docente!",
+    "Muy buen docente", "Ninguna observación",
+]
+
+
+def make_synthetic_export(n_rows, n_docentes=50, subjects_per_docente=3, comment_words=12, seed=0):
+    """
+    Build a synthetic survey export with the same headers as the real one.
+
+    Parameters:
+    -----------
+    n_rows : int
+        Number of student responses
+    n_docentes : int
+        Number of teachers
+    subjects_per_docente : int
+        Number of subjects taught by each teacher
+    comment_words : int
+        Average number of words of each free-text comment
+    seed : int
+        Seed of the random generator
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Raw export, before utils.process_columns
+    """
+    rng = np.random.default_rng(seed)
+
+    docentes = np.array([f"DOCENTE {i:04d}" for i in range(n_docentes)], dtype=object)
+    docente_codes = rng.integers(0, n_docentes, n_rows)
+    subject_codes = rng.integers(0, subjects_per_docente, n_rows)
+    asignaturas = np.array(
+        [f"ASIGNATURA {i:04d}-{j}" for i in range(n_docentes) for j in range(subjects_per_docente)],
+        dtype=object,
+    )
+
+    columns = {
+        "Marca temporal": pd.Timestamp("2025-03-01") + pd.to_timedelta(rng.integers(0, 86400 * 14, n_rows), unit="s"),
+        "Dirección de correo electrónico": [f"estudiante{i}@ucb.edu.bo" for i in range(n_rows)],
+        "Puntuación": np.zeros(n_rows, dtype=int),
+        "ID DOCENTE": docente_codes,
+        "DOCENTE": docentes[docente_codes],
+        "ASIGNATURA": asignaturas[docente_codes * subjects_per_docente + subject_codes],
+        "PARALELO": rng.integers(1, 4, n_rows),
+    }
+
+    headers = list(utils.COLUMN_RENAME_MAPPING)
+    plan_header, rating_headers = headers[0], headers[1:10]
+    general_header, comments_header = headers[10], headers[11]
+
+    columns[plan_header] = rng.choice(PLAN_RESPONSES, n_rows, p=PLAN_WEIGHTS).astype(object)
+    for header in rating_headers:
+        columns[header] = rng.choice(RATINGS, n_rows, p=RATING_WEIGHTS).astype(object)
+    columns[general_header] = rng.choice(RATINGS, n_rows, p=RATING_WEIGHTS).astype(object)
+
+    lengths = rng.poisson(comment_words, n_rows)
+    words = rng.choice(COMMENT_WORDS, lengths.sum()).tolist()
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    comments = [" ".join(words[offsets[i]:offsets[i + 1]]) for i in range(n_rows)]
+    columns[comments_header] = pd.Series(comments, dtype=object).where(lengths > 0)
+
+    return pd.DataFrame(columns)
+
+
+def analyze_data_q2_reference(data):
+    """The original groupby/apply/value_counts implementation of analyze_data_q2"""
+    rating_summary = data.groupby(['DOCENTE', 'ASIGNATURA'])[utils.RATING_COLUMNS].apply(
+        lambda group: group.apply(lambda col: col.value_counts()).fillna(0)
+    ).unstack(fill_value=0)
+    return rating_summary
+
+
+def timed(func, *args, repeat=3):
+    """Return the result of func(*args) and its best wall time in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def check_equivalence(cases=((2_000, 50), (100_000, 5))):
+    """
+    Check that analyze_data_q2 gives the counts of the reference implementation.
+
+    Both the object-dtype columns of the original loader and the categorical
+    ones of utils.process_columns are checked. Each case is (rows, teachers):
+    with few rows per subject some subjects miss a rating, with many none
+    does. Raises AssertionError on the first difference.
+    """
+    for n_rows, n_docentes in cases:
+        raw = make_synthetic_export(n_rows, n_docentes)
+        # The reference ran on the object-dtype columns of the original loader
+        plain = raw.rename(columns=utils.COLUMN_RENAME_MAPPING)
+        expected = analyze_data_q2_reference(plain)
+        for dtype, data in (("object", plain), ("categorical", utils.process_columns(raw))):
+            result = utils.analyze_data_q2(data)
+            result.index = pd.MultiIndex.from_tuples(result.index.tolist())
+            # The reference returns ints, and ratings in frequency order, when no
+            # group misses a rating; floats in sorted order otherwise
+            pd.testing.assert_frame_equal(result, expected, check_names=False,
+                                          check_dtype=False, check_like=True)
+            print(f"rows={n_rows:>9}  docentes={n_docentes:>4}  {dtype:<11}  "
+                  "analyze_data_q2 matches the reference")
+
+
+def bench_analyze(rows):
+    """Time analyze_data_q2 against the reference implementation (see check_equivalence)"""
+    for n_rows in rows:
+        raw = make_synthetic_export(n_rows)
+        plain = raw.rename(columns=utils.COLUMN_RENAME_MAPPING)
+        data = utils.process_columns(raw)
+
+        _, reference_time = timed(analyze_data_q2_reference, plain)
+        _, object_time = timed(utils.analyze_data_q2, plain)
+        _, categorical_time = timed(utils.analyze_data_q2, data)
+        print(f"rows={n_rows:>9}  reference={reference_time:8.3f}s  "
+              f"vectorized={object_time:8.3f}s  categorical={categorical_time:8.3f}s  "
+              f"speedup={reference_time / categorical_time:6.1f}x")
+
+
+def _figure_to_file(directory):
+    """The original chart path: write a PNG into `directory`, return its path"""
+    def save(fig, format="png"):
+        path = os.path.join(directory, f"figure_{time.perf_counter_ns()}.{format}")
+        fig.savefig(path)
+        return path
+    return save
+
+
+def _build_reports(data_q2, subject_index, summaries, chart_backend="matplotlib", sizes=None):
+    """Build the PDF of every teacher, return the mean seconds per report"""
+    import report_builder
+
+    docentes = subject_index.docentes()
+    start = time.perf_counter()
+    for docente in docentes:
+        docente_data = data_q2[data_q2.index.get_level_values(0) == docente]
+        pdf = report_builder.build_teacher_report(docente, docente_data, subject_index, summaries,
+                                                  chart_backend=chart_backend)
+        # A failed build returns None quickly: never time it as a report
+        assert pdf is not None, f"report of {docente} could not be built"
+        if sizes is not None:
+            sizes.append(len(pdf))
+    return (time.perf_counter() - start) / len(docentes)
+
+
+def bench_charts(n_docentes, responses_per_subject=30):
+    """Per-report latency of in-memory chart images against PNG files on disk"""
+    subjects_per_docente = 3
+    data = utils.process_columns(make_synthetic_export(
+        n_docentes * subjects_per_docente * responses_per_subject,
+        n_docentes=n_docentes, subjects_per_docente=subjects_per_docente))
+    data_q2 = utils.analyze_data_q2(data)
+    subject_index = utils.SubjectIndex(data)
+    # Fixed summaries keep the LLM out of the measurement
+    summaries = {key: "Resumen de los comentarios." for key in data_q2.index}
+
+    in_memory = utils.figure_to_buffer
+    with tempfile.TemporaryDirectory() as directory:
+        utils.figure_to_buffer = _figure_to_file(directory)
+        try:
+            disk_time = _build_reports(data_q2, subject_index, summaries)
+        finally:
+            utils.figure_to_buffer = in_memory
+    memory_time = _build_reports(data_q2, subject_index, summaries)
+
+    print(f"docentes={n_docentes}  subjects/docente={subjects_per_docente}  "
+          f"disk={disk_time:8.3f}s/report  in-memory={memory_time:8.3f}s/report  "
+          f"speedup={disk_time / memory_time:5.2f}x")
+
+
+def bench_vector(n_docentes, responses_per_subject=30):
+    """Per-report latency and PDF size of each chart backend"""
+    import charts
+
+    subjects_per_docente = 3
+    data = utils.process_columns(make_synthetic_export(
+        n_docentes * subjects_per_docente * responses_per_subject,
+        n_docentes=n_docentes, subjects_per_docente=subjects_per_docente))
+    data_q2 = utils.analyze_data_q2(data)
+    subject_index = utils.SubjectIndex(data)
+    summaries = {key: "Resumen de los comentarios." for key in data_q2.index}
+
+    # Warm up both backends (lazy imports, chart templates, fonts) on one teacher
+    import report_builder
+    docente = subject_index.docentes()[0]
+    for backend in charts.CHART_BACKENDS:
+        report_builder.build_teacher_report(
+            docente, data_q2[data_q2.index.get_level_values(0) == docente], subject_index,
+            summaries, chart_backend=backend)
+
+    results = {}
+    for backend in charts.CHART_BACKENDS:
+        sizes = []
+        seconds = _build_reports(data_q2, subject_index, summaries, backend, sizes)
+        results[backend] = (seconds, sum(sizes) / len(sizes))
+        print(f"{backend:>10}: {seconds:7.3f}s/report  {results[backend][1] / 1024:8.1f} KiB/report")
+    (mpl_seconds, mpl_size), (rl_seconds, rl_size) = (results[b] for b in charts.CHART_BACKENDS)
+    print(f"docentes={n_docentes}  speedup={mpl_seconds / rl_seconds:5.2f}x  "
+          f"size ratio={mpl_size / rl_size:5.2f}x")
+
+
+def faculty_scores_reference(data):
+    """Teacher scores the straightforward way: filter each teacher's rows and count them"""
+    import faculty
+
+    scores = {}
+    for docente in data['DOCENTE'].unique():
+        rows = data[data['DOCENTE'] == docente]
+        answers = pd.concat([rows[column] for column in utils.RATING_COLUMNS], ignore_index=True)
+        counts = answers.value_counts()
+        points = counts.index.map(faculty.RATING_SCORES).to_numpy(dtype=float)
+        scored = ~np.isnan(points)
+        scores[docente] = (
+            (counts.to_numpy()[scored] * points[scored]).sum() / counts.to_numpy()[scored].sum(),
+            100 * counts.reindex(faculty.POSITIVE_RATINGS, fill_value=0).sum() / counts.sum(),
+        )
+    return pd.DataFrame.from_dict(scores, orient='index', columns=['promedio', 'positivas'])
+
+
+def bench_faculty(rows, n_docentes=200):
+    """FacultyCube and its derived tables against re-filtering every teacher"""
+    import faculty
+
+    for n_rows in rows:
+        data = utils.process_columns(make_synthetic_export(n_rows, n_docentes=n_docentes))
+        reference, reference_seconds = timed(faculty_scores_reference, data)
+
+        def cube_scores():
+            cube = faculty.FacultyCube(data)
+            cube.criterion_means('docente')
+            cube.distribution()
+            return cube.score_table('docente')
+
+        scores, cube_seconds = timed(cube_scores)
+        scores = scores.loc[reference.index]
+        assert np.allclose(scores[['promedio', 'positivas']].to_numpy(), reference.to_numpy())
+        print(f"rows={n_rows:>9}  docentes={n_docentes}  per-teacher filtering="
+              f"{reference_seconds:8.3f}s  cube (+ all tables)={cube_seconds:8.3f}s  "
+              f"speedup={reference_seconds / cube_seconds:6.1f}x")
+
+
+def import_times(module):
+    """
+    Import `module` in a fresh interpreter under `python -X importtime`.
+
+    Returns:
+    --------
+    tuple
+        (cumulative seconds of the import, {top-level package: self seconds})
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    total = 0.0
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1e6
+        if name.strip() == module:
+            total = int(cumulative_us) / 1e6
+    return total, packages
+
+
+def bench_imports(modules, repeat=3, top=8):
+    """Cold-start import time of each module and the packages it spends it on"""
+    for module in modules:
+        runs = [import_times(module) for _ in range(repeat)]
+        total, packages = min(runs, key=lambda run: run[0])
+        heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        print(f"{module:<16} import={total:7.3f}s  " +
+              "  ".join(f"{package}={seconds:.3f}" for package, seconds in heaviest))
+
+
+class _StubLLMHandler(BaseHTTPRequestHandler):
+    """
+    Answers every generate request after the server's `latency` seconds, plus
+    `token_latency` seconds per estimated prompt token; records (tokens, delay)
+    of every call in `calls`
+    """
+
+    def do_POST(self):
+        prompt = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))["prompt"]
+        tokens = len(prompt) // 4
+        delay = self.server.latency + self.server.token_latency * tokens
+        self.server.calls.append((tokens, delay))
+        time.sleep(delay)
+        body = json.dumps({"response": "<think>...</think>Resumen de los comentarios."}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def stub_llm_server(latency, token_latency=0.0):
+    """Start a local stand-in of the Ollama API, return (server, generate url)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubLLMHandler)
+    server.latency = latency
+    server.token_latency = token_latency
+    server.calls = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _render_charts(data_q2, subject_index):
+    """Draw and encode the three charts of every subject"""
+    import charts
+
+    for (docente, asignatura), row in data_q2.iterrows():
+        rows = subject_index.get(docente, asignatura)
+        utils.figure_to_buffer(charts.plan_chart(
+            rows['plan_asignatura'].value_counts().sort_index(), docente, asignatura))
+        utils.figure_to_buffer(charts.rating_chart(row.unstack(), docente, asignatura))
+        utils.figure_to_buffer(charts.general_chart(
+            rows['evaluacion_docente_general'].value_counts().sort_index(), docente, asignatura))
+
+
+def _build_without_charts(data_q2, subject_index, summaries):
+    """Build every report with a pre-rendered chart image, timing ReportLab alone"""
+    import charts
+    import report_builder
+
+    png = utils.figure_to_buffer(charts.plan_chart(
+        subject_index.data['plan_asignatura'].value_counts().sort_index(), "", "")).getvalue()
+
+    # Replaces the function build_teacher_report draws every chart with
+    def prerendered_chart(kind, frame, docente, asignatura, width, height, chart_backend, timer):
+        image = report_builder.Image(io.BytesIO(png), width=width, height=height)
+        image.hAlign = 'CENTER'
+        return image
+
+    chart = report_builder._chart
+    report_builder._chart = prerendered_chart
+    try:
+        _build_reports(data_q2, subject_index, summaries)
+    finally:
+        report_builder._chart = chart
+
+
+def bench_pipeline(n_docentes, subjects_per_docente, responses_per_subject, comment_words,
+                   llm_latency=0.05, repeat=3):
+    """
+    Time every stage of the pipeline on a synthetic export.
+
+    Returns:
+    --------
+    dict
+        The parameters, the environment and the best time in seconds of
+        each stage, ready to be dumped as JSON
+    """
+    import ingest
+    import llm
+
+    n_rows = n_docentes * subjects_per_docente * responses_per_subject
+    raw = make_synthetic_export(n_rows, n_docentes=n_docentes,
+                                subjects_per_docente=subjects_per_docente,
+                                comment_words=comment_words)
+    stages = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "export.xlsx")
+        raw.to_excel(path, index=False)
+        engine = ingest.available_engine()
+        raw, stages["read"] = timed(lambda: ingest.read_export(path, engine=engine, cache_dir=None),
+                                    repeat=repeat)
+
+    # process_columns works in place: give every repetition its own shallow copy
+    data, stages["rename"] = timed(lambda: utils.process_columns(raw.copy(deep=False)),
+                                   repeat=repeat)
+    data_q2, stages["analyze"] = timed(utils.analyze_data_q2, data, repeat=repeat)
+    subject_index, stages["index"] = timed(utils.SubjectIndex, data, repeat=repeat)
+    _, stages["charts"] = timed(_render_charts, data_q2, subject_index, repeat=repeat)
+
+    summaries = {key: "Resumen de los comentarios." for key in data_q2.index}
+    _, stages["reportlab"] = timed(_build_without_charts, data_q2, subject_index, summaries,
+                                   repeat=repeat)
+    _, stages["pdf"] = timed(_build_reports, data_q2, subject_index, summaries, repeat=repeat)
+
+    server, url = stub_llm_server(llm_latency)
+    try:
+        batches = llm.collect_comment_batches(subject_index, data_q2.index)
+        _, stages["llm_stub"] = timed(lambda: llm.summarize_all(batches, use_cache=False, url=url),
+                                      repeat=repeat)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    return {
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "docentes": n_docentes,
+            "subjects_per_docente": subjects_per_docente,
+            "responses_per_subject": responses_per_subject,
+            "comment_words": comment_words,
+            "rows": n_rows,
+            "subjects": len(data_q2),
+            "engine": engine,
+            "llm_latency": llm_latency,
+            "llm_concurrency": llm.CONCURRENCY,
+            "repeat": repeat,
+        },
+        "stages": {stage: round(seconds, 6) for stage, seconds in stages.items()},
+    }
+
+
+def add_header_reference(canvas, doc):
+    """The original page header: checks for and draws the full-size logo file on every page"""
+    from reportlab.lib.units import inch
+
+    canvas.saveState()
+    logo_path = "./logo/logo.png"
+    if os.path.exists(logo_path):
+        canvas.drawImage(logo_path, 0.8*inch, doc.height + 0.5*inch,
+                         width=1.5*inch, height=0.7*inch, preserveAspectRatio=True, mask='auto')
+    canvas.setFont('Helvetica-Bold', 10)
+    canvas.drawRightString(doc.width + 0.5*inch, doc.height + 0.9*inch,
+                           "Dirección Académica de Sede")
+    canvas.setFont('Helvetica', 9)
+    canvas.drawRightString(doc.width + 0.5*inch, doc.height + 0.7*inch,
+                           "Departamento de Desarrollo Curricular y Calidad Académica")
+    canvas.restoreState()
+
+
+def _header_documents(on_page, n_pages, n_documents):
+    """Build `n_documents` PDFs of `n_pages` pages that only carry the header"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import BaseDocTemplate, Frame, PageBreak, PageTemplate, Spacer
+
+    size = 0
+    for _ in range(n_documents):
+        buffer = io.BytesIO()
+        doc = BaseDocTemplate(buffer, pagesize=letter)
+        frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height)
+        doc.addPageTemplates(PageTemplate(frames=frame, onPage=on_page))
+        elements = []
+        for _ in range(n_pages - 1):
+            elements += [Spacer(1, 1), PageBreak()]
+        doc.build(elements + [Spacer(1, 1)])
+        size = len(buffer.getvalue())
+    return size
+
+
+def bench_header(n_pages, n_documents):
+    """Per-page cost of the page header, original against utils.add_header"""
+    if not os.path.exists(utils.LOGO_PATH):
+        raise SystemExit(f"Run from the repository root: {utils.LOGO_PATH} not found")
+
+    _, blank_time = timed(_header_documents, lambda canvas, doc: None, n_pages, n_documents)
+    pages = n_pages * n_documents
+    for name, on_page in (("reference", add_header_reference), ("add_header", utils.add_header)):
+        size, seconds = timed(_header_documents, on_page, n_pages, n_documents)
+        print(f"{name:<10}  {(seconds - blank_time) / pages * 1000:8.3f} ms/page  "
+              f"pdf={size / 1024:8.1f} KiB ({n_pages} pages)")
+
+
+def process_columns_reference(data, latest):
+    """The original process_columns: keeps a full copy of the raw rows for get_data"""
+    latest.append(data.copy())  # stands in for the module-level _latest_data
+    data.rename(columns=utils.COLUMN_RENAME_MAPPING, inplace=True)
+    utils.encode_categories(data)
+    return data
+
+
+def traced(func, *args):
+    """Return func(*args), the peak and the retained bytes allocated while it ran"""
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak, retained
+
+
+def bench_memory(rows):
+    """Memory allocated by process_columns (+ get_data) against the copying original"""
+    for n_rows in rows:
+        latest = []
+        _, reference_peak, reference_retained = traced(
+            process_columns_reference, make_synthetic_export(n_rows), latest)
+        del latest
+
+        raw = make_synthetic_export(n_rows)
+        data, peak, retained = traced(utils.process_columns, raw)
+        _, view_peak, view_retained = traced(utils.get_data, data)
+
+        mib = 1024 * 1024
+        print(f"rows={n_rows:>9}  reference: peak={reference_peak / mib:8.1f} MiB "
+              f"retained={reference_retained / mib:8.1f} MiB  |  "
+              f"process_columns: peak={peak / mib:8.1f} MiB retained={retained / mib:8.1f} MiB  "
+              f"get_data: {view_retained / mib:6.2f} MiB")
+
+
+def make_comments(n_comments, comment_words=12, duplicate_share=0.3, seed=0):
+    """Comments of one large section, `duplicate_share` of them repeating earlier ones"""
+    rng = np.random.default_rng(seed)
+    comments = []
+    for _ in range(n_comments):
+        if comments and rng.random() < duplicate_share:
+            comment = str(rng.choice(comments))
+            comments.append(comment.upper() if rng.random() < 0.5 else f" {comment}.")
+        else:
+            n_words = max(1, int(rng.poisson(comment_words)))
+            comments.append(" ".join(rng.choice(COMMENT_WORDS, n_words)))
+    return comments
+
+
+def bench_summarize(n_comments, comment_words, latency, token_latency):
+    """One prompt with every comment against the map-reduce summarization of llm"""
+    import llm
+
+    for n in n_comments:
+        comments = make_comments(n, comment_words)
+        server, url = stub_llm_server(latency, token_latency)
+        try:
+            with llm.new_session(1) as session:
+                _, single = timed(lambda: llm._generate(
+                    session, llm.build_prompt("DOCENTE", "ASIGNATURA", comments), url,
+                    llm.REQUEST_TIMEOUT, 0), repeat=1)
+            single_calls = list(server.calls)
+            server.calls.clear()
+            _, chunked = timed(lambda: llm.summarize_comments(
+                "DOCENTE", "ASIGNATURA", comments, use_cache=False, url=url), repeat=1)
+        finally:
+            server.shutdown()
+        print(f"comments={n:>6}  single prompt: {single:6.2f}s "
+              f"({single_calls[0][0]} tokens)  |  map-reduce: {chunked:6.2f}s, "
+              f"{len(server.calls)} calls, largest {max(t for t, _ in server.calls)} tokens, "
+              f"slowest call {max(d for _, d in server.calls):.2f}s")
+
+
+def bench_comments(rows, stock_share):
+    """Prompt size and cost of collapse_comments against sending every raw comment"""
+    for n_rows in rows:
+        raw = make_synthetic_export(n_rows)
+        comments_header = list(utils.COLUMN_RENAME_MAPPING)[11]
+        rng = np.random.default_rng(1)
+        stock = rng.random(n_rows) < stock_share
+        raw.loc[stock, comments_header] = rng.choice(STOCK_COMMENTS, stock.sum())
+        data = utils.process_columns(raw)
+        subject_index = utils.SubjectIndex(data)
+        keys = [(docente, asignatura) for docente in subject_index.docentes()
+                for asignatura in subject_index.docente_rows(docente)['ASIGNATURA'].unique()]
+
+        def raw_batches():
+            return {key: subject_index.get(*key)['comentarios'].dropna().tolist() for key in keys}
+
+        def collapsed_batches():
+            collapsed = utils.collapse_comments(subject_index.data)
+            return {key: collapsed.get(key, []) for key in keys}
+
+        before, before_seconds = timed(raw_batches)
+        after, after_seconds = timed(collapsed_batches)
+        before_chars = sum(len(".".join(comments)) for comments in before.values())
+        after_chars = sum(len(".".join(comments)) for comments in after.values())
+        print(f"rows={n_rows:>9}  raw: {sum(map(len, before.values())):>8} comments "
+              f"{before_chars // 4:>9} tokens {before_seconds:.3f}s  |  collapsed: "
+              f"{sum(map(len, after.values())):>8} comments {after_chars // 4:>9} tokens "
+              f"{after_seconds:.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command")
+
+    subparsers.add_parser("check", help="analyze_data_q2 against the reference (the default)")
+
+    analyze = subparsers.add_parser("analyze", help="utils.analyze_data_q2 against the reference")
+    analyze.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+
+    charts = subparsers.add_parser("charts", help="per-report latency of chart images in memory vs on disk")
+    charts.add_argument("--docentes", type=int, default=5)
+
+    imports = subparsers.add_parser("imports", help="cold-start import time (python -X importtime)")
+    imports.add_argument("--modules", nargs="+",
+                         default=["report", "cli", "batch", "report_builder", "utils", "llm"])
+
+    pipeline = subparsers.add_parser("pipeline", help="time every pipeline stage, output JSON")
+    pipeline.add_argument("--docentes", type=int, default=10)
+    pipeline.add_argument("--subjects", type=int, default=3, help="subjects per teacher")
+    pipeline.add_argument("--responses", type=int, default=30, help="responses per subject")
+    pipeline.add_argument("--comment-words", type=int, default=12)
+    pipeline.add_argument("--llm-latency", type=float, default=0.05,
+                          help="seconds the stub LLM takes per request")
+    pipeline.add_argument("--repeat", type=int, default=3)
+    pipeline.add_argument("--output", help="JSON file to write (default: stdout)")
+
+    header = subparsers.add_parser("header", help="per-page cost of the PDF page header")
+    header.add_argument("--pages", type=int, default=24, help="pages per document")
+    header.add_argument("--documents", type=int, default=5)
+
+    memory = subparsers.add_parser("memory", help="memory of process_columns against the copying original")
+    memory.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+
+    summarize = subparsers.add_parser("summarize", help="one prompt against map-reduce summaries")
+    summarize.add_argument("--comments", type=int, nargs="+", default=[100, 1000, 5000])
+    summarize.add_argument("--comment-words", type=int, default=12)
+    summarize.add_argument("--llm-latency", type=float, default=0.05,
+                           help="seconds the stub LLM takes per request")
+    summarize.add_argument("--token-latency", type=float, default=0.0005,
+                           help="extra seconds per prompt token")
+
+    comments = subparsers.add_parser("comments", help="prompt size with and without collapse_comments")
+    comments.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    comments.add_argument("--stock-share", type=float, default=0.5,
+                          help="share of short stock answers (\"ninguno\", \"todo bien\"...)")
+
+    vector = subparsers.add_parser("vector", help="matplotlib PNG charts against ReportLab vector charts")
+    vector.add_argument("--docentes", type=int, default=5)
+
+    faculty = subparsers.add_parser("faculty", help="faculty cube against per-teacher filtering")
+    faculty.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    faculty.add_argument("--docentes", type=int, default=200)
+
+    args = parser.parse_args()
+    if args.command in (None, "check"):
+        check_equivalence()
+    elif args.command == "analyze":
+        bench_analyze(args.rows)
+    elif args.command == "charts":
+        bench_charts(args.docentes)
+    elif args.command == "imports":
+        bench_imports(args.modules)
+    elif args.command == "memory":
+        bench_memory(args.rows)
+    elif args.command == "summarize":
+        bench_summarize(args.comments, args.comment_words, args.llm_latency, args.token_latency)
+    elif args.command == "comments":
+        bench_comments(args.rows, args.stock_share)
+    elif args.command == "vector":
+        bench_vector(args.docentes)
+    elif args.command == "faculty":
+        bench_faculty(args.rows, args.docentes)
+    elif args.command == "header":
+        bench_header(args.pages, args.documents)
+    elif args.command == "pipeline":
+        result = bench_pipeline(args.docentes, args.subjects, args.responses, args.comment_words,
+                                args.llm_latency, args.repeat)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2)
+        else:
+            print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
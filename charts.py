@@ -0,0 +1,257 @@
+"""
+Per-subject bar charts of the teacher report.
+
+Two backends draw the same charts: 'matplotlib' renders figures that are
+embedded as PNG images, 'reportlab' builds vector Drawings that ReportLab
+writes straight into the PDF, much smaller and faster to produce.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Axis labels and legend of each per-subject chart
+CHART_KINDS = {
+    'plan': ('Plan Asignatura Responses', 'Count', False),
+    'rating': ('Rating Categories', 'Count', True),
+    'general': ('Evaluación', 'Cantidad', False),
+}
+
+# Title of each per-subject chart
+CHART_TITLES = {
+    'plan': 'Plan Asignatura Counts: {docente} - {asignatura}',
+    'rating': 'Rating Summary for {docente} - {asignatura}',
+    'general': 'Evaluación General del Docente: {docente} - {asignatura}',
+}
+
+# Total width of the bars of one category, as in pandas' bar plots
+BAR_WIDTH = 0.5
+
+CHART_BACKENDS = ('matplotlib', 'reportlab')
+DEFAULT_BACKEND = 'matplotlib'
+
+# matplotlib's default color cycle, so both backends color the series alike
+DEFAULT_COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
+                  '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+
+_local = threading.local()
+
+
+class BarChartTemplate:
+    """
+    A pre-built bar chart figure that is redrawn for every subject.
+
+    The figure uses the object-oriented Agg API, never pyplot, so it is not
+    registered in any global state. When a subject has the same categories
+    and series as the previous one, only the bar heights, the y limit and
+    the title are updated; the bars and x ticks are rebuilt only when the
+    categories change. The layout is recomputed on every render, since the
+    y tick labels and the title change with each subject: a chart never
+    depends on the subjects drawn before it.
+
+    Templates are not thread-safe themselves: use get_template, which keeps
+    one set of templates per thread.
+    """
+
+    def __init__(self, xlabel, ylabel, legend=False, figsize=(10, 6)):
+        # matplotlib is only loaded once the first chart is drawn
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.figure = Figure(figsize=figsize)
+        FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot()
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.legend = legend
+        self._layout_key = None
+        self._bars = []
+
+    def render(self, frame, title, colors=None):
+        """
+        Draw `frame` and return the figure.
+
+        Parameters:
+        -----------
+        frame : pandas.DataFrame or pandas.Series
+            Bar heights; the index gives the x categories and each column one
+            series of bars
+        title : str
+            Chart title
+        colors : list
+            One color per series, matplotlib's default cycle when not given
+
+        Returns:
+        --------
+        matplotlib.figure.Figure
+            The template's figure; it is redrawn by the next call to render
+        """
+        if isinstance(frame, pd.Series):
+            frame = frame.to_frame()
+
+        layout_key = (tuple(frame.index), tuple(frame.columns), tuple(colors or ()))
+        if layout_key != self._layout_key:
+            self._rebuild(frame, title, colors)
+            self._layout_key = layout_key
+        else:
+            for bars, column in zip(self._bars, frame.columns):
+                for bar, height in zip(bars, frame[column].to_numpy()):
+                    bar.set_height(height)
+            self.ax.set_title(title)
+
+        top = frame.to_numpy(dtype=float).max(initial=0)
+        self.ax.set_ylim(0, top * 1.05 if top > 0 else 1)
+        self.figure.tight_layout()
+        return self.figure
+
+    def _rebuild(self, frame, title, colors):
+        ax = self.ax
+        ax.clear()
+
+        positions = np.arange(len(frame.index))
+        width = BAR_WIDTH / max(len(frame.columns), 1)
+        self._bars = []
+        for i, column in enumerate(frame.columns):
+            offset = (i - (len(frame.columns) - 1) / 2) * width
+            color = colors[i] if colors else f"C{i}"
+            self._bars.append(ax.bar(positions + offset, frame[column].to_numpy(), width,
+                                     label=str(column), color=color))
+
+        ax.set_xticks(positions, [str(category) for category in frame.index], rotation=45)
+        ax.set_xlabel(self.xlabel)
+        ax.set_ylabel(self.ylabel)
+        if self.legend:
+            ax.legend()
+        ax.set_title(title)
+
+
+def get_template(kind):
+    """Return this thread's template of a chart kind ('plan', 'rating' or 'general')"""
+    templates = getattr(_local, 'templates', None)
+    if templates is None:
+        templates = _local.templates = {}
+    if kind not in templates:
+        xlabel, ylabel, legend = CHART_KINDS[kind]
+        templates[kind] = BarChartTemplate(xlabel, ylabel, legend)
+    return templates[kind]
+
+
+def plan_chart(plan_counts, docente, asignatura):
+    """Bar chart of the plan_asignatura answers of one subject"""
+    return get_template('plan').render(
+        plan_counts, CHART_TITLES['plan'].format(docente=docente, asignatura=asignatura))
+
+
+def rating_chart(ratings, docente, asignatura, colors=None):
+    """Grouped bar chart of the question 2 ratings (criteria x ratings) of one subject"""
+    return get_template('rating').render(
+        ratings, CHART_TITLES['rating'].format(docente=docente, asignatura=asignatura), colors)
+
+
+def general_chart(general_eval_counts, docente, asignatura):
+    """Bar chart of the evaluacion_docente_general answers of one subject"""
+    return get_template('general').render(
+        general_eval_counts, CHART_TITLES['general'].format(docente=docente, asignatura=asignatura))
+
+
+# matplotlib chart of each kind, called as chart(frame, docente, asignatura)
+MATPLOTLIB_CHARTS = {
+    'plan': plan_chart,
+    'rating': rating_chart,
+    'general': general_chart,
+}
+
+
+def chart_drawing(kind, frame, docente, asignatura, width, height, colors=None):
+    """
+    Draw a per-subject chart as ReportLab vector graphics.
+
+    Same bars, labels, title and colors as the matplotlib chart of `kind`,
+    without rasterizing anything.
+
+    Parameters:
+    -----------
+    kind : str
+        'plan', 'rating' or 'general'
+    frame : pandas.DataFrame or pandas.Series
+        Bar heights; the index gives the x categories and each column one
+        series of bars
+    docente, asignatura : str
+        Teacher and subject, for the title
+    width, height : float
+        Size of the drawing, in points
+    colors : list
+        One hex color per series, DEFAULT_COLORS when not given
+
+    Returns:
+    --------
+    reportlab.graphics.shapes.Drawing
+        A flowable that can be added to a story as is
+    """
+    # ReportLab's chart library is only loaded by the vector backend
+    from reportlab.graphics.charts.barcharts import VerticalBarChart
+    from reportlab.graphics.charts.legends import Legend
+    from reportlab.graphics.shapes import Drawing, Group, String
+    from reportlab.lib.colors import HexColor
+
+    if isinstance(frame, pd.Series):
+        frame = frame.to_frame()
+    xlabel, ylabel, legend = CHART_KINDS[kind]
+    colors = [HexColor(color) for color in (colors or DEFAULT_COLORS)]
+    font_name, font_size = 'Helvetica', 7
+    legend_width = 70 if legend else 0
+
+    drawing = Drawing(width, height)
+
+    chart = VerticalBarChart()
+    chart.x = 40
+    chart.y = 55
+    chart.width = width - chart.x - 10 - legend_width
+    chart.height = height - chart.y - 25
+    chart.data = [tuple(frame[column].to_numpy(dtype=float)) for column in frame.columns]
+    chart.categoryAxis.categoryNames = [str(category) for category in frame.index]
+    chart.categoryAxis.labels.angle = 45
+    chart.categoryAxis.labels.boxAnchor = 'ne'
+    chart.categoryAxis.labels.dy = -2
+    for labels in (chart.categoryAxis.labels, chart.valueAxis.labels):
+        labels.fontName = font_name
+        labels.fontSize = font_size
+    top = frame.to_numpy(dtype=float).max(initial=0)
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.valueMax = top * 1.05 if top > 0 else 1
+    # The bars of a category fill BAR_WIDTH of it, as in the matplotlib charts
+    chart.barWidth = 1
+    chart.barSpacing = 0
+    chart.groupSpacing = len(frame.columns) * (1 - BAR_WIDTH) / BAR_WIDTH
+    for i in range(len(frame.columns)):
+        chart.bars[i].fillColor = colors[i % len(colors)]
+        chart.bars[i].strokeColor = None
+    drawing.add(chart)
+
+    drawing.add(String(chart.x + chart.width / 2, height - 12,
+                       CHART_TITLES[kind].format(docente=docente, asignatura=asignatura),
+                       textAnchor='middle', fontName=font_name, fontSize=font_size + 2))
+    drawing.add(String(chart.x + chart.width / 2, 2, xlabel,
+                       textAnchor='middle', fontName=font_name, fontSize=font_size))
+    label = Group(String(0, 0, ylabel, textAnchor='middle', fontName=font_name,
+                         fontSize=font_size))
+    label.translate(10, chart.y + chart.height / 2)
+    label.rotate(90)
+    drawing.add(label)
+
+    if legend:
+        key = Legend()
+        key.x = chart.x + chart.width + 8
+        key.y = chart.y + chart.height
+        key.boxAnchor = 'nw'
+        key.alignment = 'right'  # text right of the swatches
+        key.fontName = font_name
+        key.fontSize = font_size
+        key.dx = key.dy = 6
+        key.deltay = 10
+        key.columnMaximum = len(frame.columns)
+        key.colorNamePairs = [(colors[i % len(colors)], str(column))
+                              for i, column in enumerate(frame.columns)]
+        drawing.add(key)
+
+    return drawing
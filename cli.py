@@ -0,0 +1,216 @@
+"""
+Generate the PDF report of every teacher of a survey export without Streamlit.
+
+Usage:
+    python cli.py export.xlsx reports/
+    python cli.py export.xlsx reports/ --docente "PEREZ JUAN" --workers 4 --no-llm
+    python cli.py export.xlsx reports/ --zip
+    python cli.py export.xlsx reports/ --charts reportlab
+    python cli.py export.xlsx reports/ --faculty
+
+Reports are regenerated incrementally: a manifest next to them records the
+data each one was built from, and teachers whose responses did not change
+since the last run are reused (use --force to rebuild everything).
+"""
+import argparse
+import itertools
+import logging
+import os
+import sys
+import time
+import zipfile
+
+import batch
+import charts
+import faculty
+import ingest
+import llm
+import manifest
+import profiling
+import utils
+
+ZIP_NAME = "reports.zip"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("export", help="survey export (.xlsx)")
+    parser.add_argument("output_dir", help="directory the PDF reports are written to")
+    parser.add_argument("--docente", action="append",
+                        help="only this teacher (can be repeated)")
+    parser.add_argument("--asignatura", action="append",
+                        help="only this subject (can be repeated)")
+    parser.add_argument("--workers", type=int, default=batch.default_workers(),
+                        help="worker processes (default: %(default)s)")
+    parser.add_argument("--no-llm", action="store_true",
+                        help="skip the LLM summaries of the comments")
+    parser.add_argument("--llm-concurrency", type=int, default=llm.CONCURRENCY,
+                        help="concurrent LLM requests (default: %(default)s)")
+    parser.add_argument("--zip", action="store_true",
+                        help=f"write a single {ZIP_NAME} instead of one PDF per teacher")
+    parser.add_argument("--charts", choices=charts.CHART_BACKENDS, default=charts.DEFAULT_BACKEND,
+                        help="draw the charts as PNG images (matplotlib) or as vector "
+                             "graphics (reportlab, smaller and faster; default: %(default)s)")
+    parser.add_argument("--faculty", action="store_true",
+                        help="also write the faculty overview (rankings and heatmaps of "
+                             "every teacher and subject)")
+    parser.add_argument("--faculty-sort", choices=list(faculty.SCORE_COLUMNS), default="promedio",
+                        help="score the faculty rankings follow (default: %(default)s)")
+    parser.add_argument("--force", action="store_true",
+                        help="rebuild every report, even the unchanged ones")
+    parser.add_argument("--profile", choices=profiling.PROFILERS,
+                        help="profile the run and write the result to OUTPUT_DIR; "
+                             "use --workers 1 to include the report builds")
+    return parser.parse_args(argv)
+
+
+def _archived_reports(path, entries):
+    """Yield (docente, pdf_bytes) of the reports reused from a previous ZIP"""
+    with zipfile.ZipFile(path) as archive:
+        for docente, name in entries:
+            yield docente, archive.read(name)
+
+
+def _archive_names(path):
+    try:
+        with zipfile.ZipFile(path) as archive:
+            return set(archive.namelist())
+    except (OSError, zipfile.BadZipFile):
+        return set()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    with profiling.Profile(args.profile) as profile:
+        status = run(args)
+    if args.profile:
+        os.makedirs(args.output_dir, exist_ok=True)
+        path = os.path.join(args.output_dir, f"profile{profile.suffix}")
+        profile.save(path)
+        print(f"Profile written to {path}")
+    return status
+
+
+def run(args):
+    """Generate the reports described by the parsed command line, return the exit status"""
+    timings = {}
+
+    start = time.perf_counter()
+    data = utils.process_columns(ingest.read_export(args.export))
+    if args.docente:
+        data = data[data['DOCENTE'].isin(args.docente)]
+    if args.asignatura:
+        data = data[data['ASIGNATURA'].isin(args.asignatura)]
+    if data.empty:
+        print("No teachers match the given filters.", file=sys.stderr)
+        return 1
+    data_q2 = utils.analyze_data_q2(data)
+    subject_index = utils.SubjectIndex(data)
+    # Teachers without question 2 ratings have no report (as in the app)
+    docentes = list(data_q2.index.get_level_values(0).unique())
+    timings['load'] = time.perf_counter() - start
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    if args.faculty:
+        # Cheap to rebuild from the cube, so it is written on every run
+        import faculty_report
+
+        start = time.perf_counter()
+        path = os.path.join(args.output_dir, faculty_report.FACULTY_REPORT_NAME)
+        with open(path, "wb") as f:
+            f.write(faculty_report.build_faculty_report(faculty.FacultyCube(data),
+                                                        args.faculty_sort))
+        timings['faculty'] = time.perf_counter() - start
+        print(f"Faculty overview written to {path}")
+
+    zip_path = os.path.join(args.output_dir, ZIP_NAME)
+    if args.zip:
+        archived = _archive_names(zip_path)
+        exists = archived.__contains__
+    else:
+        def exists(name):
+            return name is not None and os.path.exists(os.path.join(args.output_dir, name))
+
+    summaries_model = None if args.no_llm else llm.MODEL
+    if args.force:
+        previous = manifest.new_manifest(summaries_model, args.charts)
+    else:
+        previous = manifest.load_manifest(args.output_dir, summaries_model, args.charts)
+    reported = set(docentes)
+    fingerprints = {docente: subjects for docente, subjects
+                    in manifest.docente_fingerprints(subject_index).items() if docente in reported}
+    stale = manifest.stale_docentes(previous, fingerprints, exists)
+    print(f"{len(stale)} reports to build, {len(docentes) - len(stale)} unchanged")
+
+    if not stale:
+        return 0
+
+    start = time.perf_counter()
+    if args.no_llm:
+        summaries = {}
+    else:
+        wanted = set(stale)
+        summaries = llm.summarize_all(
+            llm.collect_comment_batches(
+                subject_index, [key for key in data_q2.index if key[0] in wanted]),
+            concurrency=args.llm_concurrency)
+    timings['summaries'] = time.perf_counter() - start
+
+    # Reports with a failed summary are not recorded, so the next run retries them
+    incomplete = {key[0] for key, summary in summaries.items() if isinstance(summary, Exception)}
+
+    def progress(done, total, docente):
+        print(f"[{done}/{total}] {docente}", flush=True)
+
+    start = time.perf_counter()
+    reports = batch.iter_pdf_reports(
+        data, data_q2, stale, max_workers=args.workers, progress_callback=progress,
+        subject_index=subject_index, summaries=summaries, notify=batch.log_notify,
+        chart_backend=args.charts)
+
+    def recorded(reports):
+        for docente, pdf_bytes in reports:
+            if pdf_bytes is not None and docente not in incomplete:
+                manifest.record(previous, docente, fingerprints[docente],
+                                batch.report_filename(docente))
+            yield docente, pdf_bytes
+
+    # Reports are written as they arrive, never all held in memory
+    if args.zip:
+        # Every report of the previous archive that is not rebuilt is carried over
+        rebuilt = {str(docente) for docente in stale}
+        entries = [(docente, entry["file"]) for docente, entry in previous["docentes"].items()
+                   if docente not in rebuilt and entry["file"] in archived]
+        temp_path = f"{zip_path}.{os.getpid()}.tmp"
+        try:
+            failed = batch.write_reports_zip(
+                itertools.chain(_archived_reports(zip_path, entries) if entries else (),
+                                recorded(reports)),
+                temp_path)
+            os.replace(temp_path, zip_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    else:
+        failed = []
+        for docente, pdf_bytes in recorded(reports):
+            if pdf_bytes is None:
+                failed.append(docente)
+                continue
+            with open(os.path.join(args.output_dir, batch.report_filename(docente)), "wb") as f:
+                f.write(pdf_bytes)
+    timings['pdf'] = time.perf_counter() - start
+    manifest.save_manifest(args.output_dir, previous)
+
+    print(f"{len(stale) - len(failed)} reports written to {args.output_dir}")
+    print("  ".join(f"{stage}={seconds:.2f}s" for stage, seconds in timings.items()))
+    for docente in failed:
+        print(f"Failed: {docente}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
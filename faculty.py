@@ -0,0 +1,207 @@
+"""
+Faculty-wide aggregates of the survey, for rankings across all teachers.
+
+FacultyCube counts every (DOCENTE, ASIGNATURA, criterion, rating) in a
+single pass over the processed data. Every table of the faculty overview
+(scores, rankings, heatmaps, rating distributions) is then derived from
+those counts, per subject or summed per teacher, without filtering the
+rows of any teacher again.
+"""
+import numpy as np
+import pandas as pd
+
+import utils
+
+# Criteria of the cube: the question 2 criteria and the general evaluation
+CRITERIA = utils.RATING_COLUMNS + ['evaluacion_docente_general']
+GENERAL = 'evaluacion_docente_general'
+
+# Short labels of the criteria for table headers
+CRITERION_LABELS = {
+    'puntualidad': 'Puntualidad',
+    'ambiente': 'Ambiente',
+    'disponibilidad': 'Disponib.',
+    'planificación': 'Planific.',
+    'desarrollo': 'Desarrollo',
+    'estrategias': 'Estrategias',
+    'claridad': 'Claridad',
+    'tareas': 'Tareas',
+    'retroalimentación': 'Retroalim.',
+    'evaluacion_docente_general': 'General',
+}
+
+# Points of each rating in the weighted mean (1 to 5). Ratings missing here
+# are counted in the distributions but left out of the means.
+RATING_SCORES = {
+    'Excelente': 5,
+    'Bueno': 4,
+    'Regular': 3,
+    'Algo Deficiente': 2,
+    'Deficiente': 2,
+    'Totalmente Deficiente': 1,
+    'Insuficiente': 1,
+}
+SCORE_RANGE = (1, 5)
+
+# Ratings counted as positive in the "% Excelente/Bueno" score
+POSITIVE_RATINGS = ['Excelente', 'Bueno']
+
+# Columns of score_table, the first one being the default ranking
+SCORE_COLUMNS = {
+    'promedio': 'Promedio',
+    'positivas': '% Excelente / Bueno',
+    'general': 'Evaluación general',
+    'respuestas': 'Respuestas',
+}
+
+
+class FacultyCube:
+    """
+    Counts of every rating of every criterion per teacher and subject.
+
+    Parameters:
+    -----------
+    data : pandas.DataFrame
+        Processed survey rows (output of utils.process_columns)
+
+    Attributes:
+    -----------
+    subjects : pandas.MultiIndex
+        (DOCENTE, ASIGNATURA) of each subject, sorted
+    criteria : list
+        Criteria present in the data, in CRITERIA order
+    ratings : pandas.Index
+        Every rating given, in category order
+    counts : numpy.ndarray
+        Counts of shape (subjects, criteria, ratings)
+    responses : numpy.ndarray
+        Number of survey rows of each subject
+    """
+
+    def __init__(self, data):
+        self.criteria = [column for column in CRITERIA if column in data.columns]
+        # Same counting and rating vocabulary as utils.analyze_data_q2
+        sizes, self.ratings, self.counts = utils.count_ratings(data, self.criteria)
+        self.subjects = sizes.index
+        self.responses = sizes.to_numpy()
+
+    def _rows(self, by):
+        """Return (index, counts, responses) per subject or summed per teacher"""
+        if by == 'subject':
+            return self.subjects, self.counts, self.responses
+        if by != 'docente':
+            raise ValueError(f"Unknown level {by!r}, expected 'docente' or 'subject'")
+        codes, docentes = pd.factorize(self.subjects.get_level_values(0), sort=True)
+        counts = np.zeros((len(docentes),) + self.counts.shape[1:])
+        np.add.at(counts, codes, self.counts)
+        responses = np.bincount(codes, weights=self.responses, minlength=len(docentes))
+        return pd.Index(docentes, name='DOCENTE'), counts, responses.astype(int)
+
+    def frame(self):
+        """
+        Return the cube as a table.
+
+        Returns:
+        --------
+        pandas.DataFrame
+            Counts indexed by (DOCENTE, ASIGNATURA, criterion), one column per rating
+        """
+        index = pd.MultiIndex.from_tuples(
+            [(docente, asignatura, criterion)
+             for docente, asignatura in self.subjects for criterion in self.criteria],
+            names=['DOCENTE', 'ASIGNATURA', 'criterio'])
+        return pd.DataFrame(self.counts.reshape(-1, len(self.ratings)), index=index,
+                            columns=self.ratings)
+
+    def _scores(self):
+        """Points of each rating, NaN for the ratings without a score"""
+        return np.array([RATING_SCORES.get(rating, np.nan) for rating in self.ratings], dtype=float)
+
+    def _means(self, counts):
+        """Weighted mean score of counts (..., ratings), NaN without scored answers"""
+        scores = self._scores()
+        scored = ~np.isnan(scores)
+        weights = counts[..., scored]
+        totals = weights.sum(axis=-1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(totals > 0, weights @ scores[scored] / np.where(totals > 0, totals, 1),
+                            np.nan)
+
+    def criterion_means(self, by='docente'):
+        """
+        Return the weighted mean score of every criterion.
+
+        Parameters:
+        -----------
+        by : str
+            'docente' for one row per teacher, 'subject' for one row per
+            (DOCENTE, ASIGNATURA)
+
+        Returns:
+        --------
+        pandas.DataFrame
+            Mean scores (SCORE_RANGE), one column per criterion
+        """
+        index, counts, _ = self._rows(by)
+        return pd.DataFrame(self._means(counts), index=index, columns=self.criteria)
+
+    def score_table(self, by='docente', sort_by='promedio', ascending=False):
+        """
+        Return the scores of every teacher or subject, ranked.
+
+        Columns (see SCORE_COLUMNS): 'promedio', the weighted mean of the
+        question 2 criteria; 'positivas', the percentage of Excelente and
+        Bueno answers to them; 'general', the weighted mean of the general
+        evaluation; 'respuestas', the number of survey responses. Teachers
+        also get 'asignaturas', their number of subjects.
+
+        Parameters:
+        -----------
+        by : str
+            'docente' or 'subject', as in criterion_means
+        sort_by : str
+            Column the ranking follows
+        ascending : bool
+            Rank the lowest values first
+
+        Returns:
+        --------
+        pandas.DataFrame
+            One row per teacher or subject with the scores and its 'puesto'
+            (rank, 1 being the first)
+        """
+        index, counts, responses = self._rows(by)
+        q2 = [position for position, criterion in enumerate(self.criteria) if criterion != GENERAL]
+        q2_counts = counts[:, q2, :].sum(axis=1)
+        totals = q2_counts.sum(axis=1)
+        positive = q2_counts[:, self.ratings.isin(POSITIVE_RATINGS)].sum(axis=1)
+
+        table = pd.DataFrame({
+            'promedio': self._means(q2_counts),
+            'positivas': np.where(totals > 0, 100 * positive / np.where(totals > 0, totals, 1),
+                                  np.nan),
+            'general': (self._means(counts[:, self.criteria.index(GENERAL), :])
+                        if GENERAL in self.criteria else np.nan),
+            'respuestas': responses,
+        }, index=index)
+        if by == 'docente':
+            codes, _ = pd.factorize(self.subjects.get_level_values(0), sort=True)
+            table.insert(len(table.columns) - 1, 'asignaturas', np.bincount(codes))
+
+        table = table.sort_values(sort_by, ascending=ascending, kind='stable', na_position='last')
+        table.insert(0, 'puesto', np.arange(1, len(table) + 1))
+        return table
+
+    def distribution(self):
+        """
+        Return the faculty-wide share of each rating per criterion.
+
+        Returns:
+        --------
+        pandas.DataFrame
+            Percentages indexed by criterion, one column per rating
+        """
+        counts = self.counts.sum(axis=0)
+        totals = counts.sum(axis=1, keepdims=True)
+        shares = np.divide(100 * counts, totals, out=np.zeros_like(counts), where=totals > 0)
+        return pd.DataFrame(shares, index=self.criteria, columns=self.ratings)
@@ -0,0 +1,200 @@
+"""
+Build the faculty overview PDF from a faculty.FacultyCube.
+
+The overview ranks every teacher and subject and shows, as heatmaps, the
+mean score of each criterion per teacher and the faculty-wide distribution
+of the ratings. Like report_builder it does not depend on Streamlit and
+returns the PDF bytes.
+"""
+import functools
+import io
+from datetime import datetime
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import (BaseDocTemplate, Frame, PageBreak, PageTemplate, Paragraph,
+                                Spacer, Table, TableStyle)
+
+import faculty
+import report_template
+import utils
+
+FACULTY_REPORT_NAME = "faculty_report.pdf"
+
+# Heatmap colors from the lowest to the highest value: scores go from red
+# to green, shares of answers (neither good nor bad) from white to blue
+SCORE_COLORS = [colors.HexColor('#f8696b'), colors.HexColor('#ffeb84'),
+                colors.HexColor('#63be7b')]
+SHARE_COLORS = [colors.white, colors.HexColor('#5b9bd5')]
+
+HEADER_BACKGROUND = colors.HexColor('#1f3864')
+
+INTRO_TEXT = (
+    "Este resumen reúne los resultados de la evaluación docente de todos los docentes y "
+    "asignaturas de la facultad. El promedio pondera cada respuesta de los criterios de "
+    "desempeño en una escala de {low} (más baja) a {high} (Excelente); el porcentaje "
+    "Excelente/Bueno indica la proporción de respuestas en las dos valoraciones más altas."
+)
+
+
+def heatmap_color(value, low, high, stops=SCORE_COLORS):
+    """Return the color of `value` on a scale from `low` to `high` through `stops`"""
+    if value != value:  # NaN
+        return colors.white
+    position = min(max((value - low) / (high - low), 0.0), 1.0) if high > low else 1.0
+    segment = min(int(position * (len(stops) - 1)), len(stops) - 2)
+    start = segment / (len(stops) - 1)
+    end = (segment + 1) / (len(stops) - 1)
+    return colors.linearlyInterpolatedColor(stops[segment], stops[segment + 1],
+                                            start, end, position)
+
+
+def _format(value, pattern):
+    return "—" if value != value else pattern.format(value)
+
+
+@functools.lru_cache(maxsize=None)
+def _header_style(font_size):
+    return ParagraphStyle(f'TableHeader{font_size}', fontName='Helvetica-Bold', fontSize=font_size,
+                          leading=font_size * 1.2, textColor=colors.white, alignment=1)
+
+
+def _table(rows, col_widths, font_size=8, heat=None, text_columns=1):
+    """
+    Return a table with a header row and repeated headers on page breaks.
+
+    Header cells wrap within their column. The first `text_columns` columns
+    are aligned left, the others centered. `heat` is a list of
+    (column, row, color) cell backgrounds.
+    """
+    rows = [[Paragraph(str(label), _header_style(font_size)) for label in rows[0]]] + rows[1:]
+    table = Table(rows, colWidths=col_widths, repeatRows=1)
+    style = [
+        ('FONTSIZE', (0, 0), (-1, -1), font_size),
+        ('BACKGROUND', (0, 0), (-1, 0), HEADER_BACKGROUND),
+        ('ALIGN', (text_columns, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+        ('TOPPADDING', (0, 0), (-1, -1), 2),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+    ]
+    if heat is None:
+        style.append(('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.whitesmoke]))
+    else:
+        style.extend(('BACKGROUND', (column, row), (column, row), color)
+                     for column, row, color in heat)
+    table.setStyle(TableStyle(style))
+    return table
+
+
+def ranking_table(scores, width, by='docente'):
+    """Table of score_table rows, in their ranking order"""
+    name_columns = ["Docente"] if by == 'docente' else ["Docente", "Asignatura"]
+    count_columns = ["Asignaturas", "Respuestas"] if by == 'docente' else ["Respuestas"]
+    header = ["#"] + name_columns + [faculty.SCORE_COLUMNS['promedio'],
+                                     faculty.SCORE_COLUMNS['positivas'],
+                                     faculty.SCORE_COLUMNS['general']] + count_columns
+    rows = [header]
+    for key, row in scores.iterrows():
+        names = [str(key)] if by == 'docente' else [str(part) for part in key]
+        counts = ([int(row['asignaturas'])] if by == 'docente' else []) + [int(row['respuestas'])]
+        rows.append([int(row['puesto'])] + names + [
+            _format(row['promedio'], "{:.2f}"),
+            _format(row['positivas'], "{:.1f}%"),
+            _format(row['general'], "{:.2f}"),
+        ] + counts)
+
+    number_widths = [0.8*inch] * 3 + [0.85*inch] * len(count_columns)
+    name_width = (width - 0.35*inch - sum(number_widths)) / len(name_columns)
+    return _table(rows, [0.35*inch] + [name_width] * len(name_columns) + number_widths,
+                  text_columns=1 + len(name_columns))
+
+
+def heatmap_table(frame, width, value_format, low, high, first_header, stops=SCORE_COLORS):
+    """Table of `frame` with each cell colored by its value from `low` to `high`"""
+    labels = [faculty.CRITERION_LABELS.get(column, str(column)) for column in frame.columns]
+    rows = [[first_header] + labels]
+    heat = []
+    for row_number, (key, values) in enumerate(frame.iterrows(), start=1):
+        label = key if not isinstance(key, tuple) else " - ".join(map(str, key))
+        rows.append([faculty.CRITERION_LABELS.get(label, str(label))]
+                    + [_format(value, value_format) for value in values])
+        heat.extend((column, row_number, heatmap_color(value, low, high, stops))
+                    for column, value in enumerate(values, start=1))
+
+    cell_width = min(0.6*inch, (width - 1.6*inch) / len(labels))
+    return _table(rows, [width - cell_width * len(labels)] + [cell_width] * len(labels),
+                  font_size=6.5, heat=heat)
+
+
+def build_faculty_report(cube, sort_by='promedio', ascending=False, title="Resumen de la Facultad"):
+    """
+    Build the faculty overview PDF.
+
+    Parameters:
+    -----------
+    cube : faculty.FacultyCube
+        Aggregates of the survey
+    sort_by : str
+        Column of faculty.SCORE_COLUMNS the rankings follow
+    ascending : bool
+        Rank the lowest values first
+    title : str
+        Title of the first page
+
+    Returns:
+    --------
+    bytes
+        The PDF
+    """
+    buffer = io.BytesIO()
+    margin = 0.75 * inch
+    doc = BaseDocTemplate(buffer, pagesize=letter, topMargin=1.25*inch, bottomMargin=0.75*inch,
+                          leftMargin=margin, rightMargin=margin)
+    frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height - 0.5*inch, id='content')
+    doc.addPageTemplates(PageTemplate(id='faculty_template', frames=frame, onPage=utils.add_header))
+
+    style = report_template.styles()
+    low, high = faculty.SCORE_RANGE
+    docente_scores = cube.score_table('docente', sort_by, ascending)
+    subject_scores = cube.score_table('subject', sort_by, ascending)
+
+    elements = [
+        Paragraph(title, style['title']),
+        Paragraph(
+            f"<b>Docentes:</b> {len(docente_scores)}. <b>Asignaturas:</b> {len(subject_scores)}. "
+            f"<b>Respuestas:</b> {int(cube.responses.sum())}.", style['normal']),
+        Spacer(1, 0.1*inch),
+        Paragraph(f"Generado el: {datetime.now().strftime('%d de %B de %Y')}", style['italic']),
+        Paragraph(INTRO_TEXT.format(low=low, high=high), style['explanation']),
+
+        Paragraph("Ranking de Docentes", style['section']),
+        Paragraph(f"Ordenado por {faculty.SCORE_COLUMNS[sort_by]}.", style['normal']),
+        Spacer(1, 0.1*inch),
+        ranking_table(docente_scores, doc.width),
+        PageBreak(),
+
+        Paragraph("Promedio por Criterio y Docente", style['section']),
+        Paragraph(f"Promedio ponderado de cada criterio, de {low} a {high}.", style['normal']),
+        Spacer(1, 0.1*inch),
+        heatmap_table(cube.criterion_means('docente').loc[docente_scores.index], doc.width,
+                      "{:.2f}", low, high, "Docente"),
+        Spacer(1, 0.2*inch),
+
+        Paragraph("Distribución de las Valoraciones", style['section']),
+        Paragraph("Porcentaje de respuestas de cada valoración por criterio, en toda la facultad.",
+                  style['normal']),
+        Spacer(1, 0.1*inch),
+        heatmap_table(cube.distribution(), doc.width, "{:.1f}%", 0, 100, "Criterio",
+                      SHARE_COLORS),
+        PageBreak(),
+
+        Paragraph("Ranking de Asignaturas", style['section']),
+        Spacer(1, 0.1*inch),
+        ranking_table(subject_scores, doc.width, by='subject'),
+    ]
+
+    doc.build(elements)
+    return buffer.getvalue()
@@ -0,0 +1,140 @@
+import hashlib
+import io
+import json
+import os
+
+import pandas as pd
+
+import utils
+
+# Columns of the export that the reports use: the grouping keys and every
+# question renamed by utils.process_columns
+SURVEY_COLUMNS = ['DOCENTE', 'ASIGNATURA'] + list(utils.COLUMN_RENAME_MAPPING)
+
+PARQUET_CACHE_DIR = "./cache/exports"
+PARQUET_CACHE_ENTRIES = 20
+
+
+def available_engine():
+    """Return the fastest Excel reader installed: 'calamine' or 'openpyxl'"""
+    try:
+        import python_calamine  # noqa: F401
+        return "calamine"
+    except ImportError:
+        return "openpyxl"
+
+
+def _read_openpyxl(content, columns):
+    """
+    Read the first sheet with openpyxl in read-only mode, keeping only `columns`.
+
+    Rows are streamed with iter_rows and only the projected cells are
+    materialized, instead of building a frame of every column first.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(content), read_only=True, data_only=True, keep_links=False)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, ())
+
+        if columns is None:
+            positions = [i for i, name in enumerate(header) if name is not None]
+        else:
+            wanted = set(columns)
+            positions = [i for i, name in enumerate(header) if name in wanted]
+        names = [header[i] for i in positions]
+
+        records = []
+        for row in rows:
+            records.append([row[i] if i < len(row) else None for i in positions])
+    finally:
+        workbook.close()
+
+    # pandas drops the empty rows at the end of a sheet
+    while records and all(value is None for value in records[-1]):
+        records.pop()
+
+    return pd.DataFrame(records, columns=names).fillna(value=float('nan')).infer_objects()
+
+
+def _read_excel(content, engine, columns):
+    if engine == "openpyxl":
+        return _read_openpyxl(content, columns)
+
+    usecols = None if columns is None else (lambda name: name in set(columns))
+    return pd.read_excel(io.BytesIO(content), engine=engine, usecols=usecols)
+
+
+def _cache_path(cache_dir, content, columns):
+    digest = hashlib.sha256(content)
+    digest.update(json.dumps(columns, ensure_ascii=False).encode("utf-8"))
+    return os.path.join(cache_dir, f"{digest.hexdigest()}.parquet")
+
+
+def _prune_cache(cache_dir, max_entries):
+    """Keep only the `max_entries` most recently used Parquet files"""
+    paths = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+             if name.endswith(".parquet")]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for path in paths[max_entries:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def read_export(source, engine=None, columns=SURVEY_COLUMNS, cache_dir=PARQUET_CACHE_DIR):
+    """
+    Load a survey export, reusing a Parquet copy when the same file was read before.
+
+    Parameters:
+    -----------
+    source : str, bytes or file-like
+        Path of the .xlsx file, its content, or an object with read()
+        (e.g. a Streamlit upload)
+    engine : str
+        'calamine' or 'openpyxl'; the fastest available when not given
+    columns : list
+        Columns to load; SURVEY_COLUMNS by default, None loads every column
+    cache_dir : str
+        Directory of the Parquet cache; None disables it
+
+    Returns:
+    --------
+    pandas.DataFrame
+        The export with its original headers, before utils.process_columns
+    """
+    if isinstance(source, (bytes, bytearray)):
+        content = bytes(source)
+    elif hasattr(source, "read"):
+        content = source.getvalue() if hasattr(source, "getvalue") else source.read()
+    else:
+        with open(source, "rb") as f:
+            content = f.read()
+
+    path = None
+    if cache_dir is not None:
+        path = _cache_path(cache_dir, content, columns)
+        if os.path.exists(path):
+            try:
+                data = pd.read_parquet(path)
+                os.utime(path)
+                return data
+            except (ImportError, OSError, ValueError):
+                pass
+
+    data = _read_excel(content, engine or available_engine(), columns)
+
+    if path is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            data.to_parquet(temp_path, index=False)
+            os.replace(temp_path, path)
+            _prune_cache(cache_dir, PARQUET_CACHE_ENTRIES)
+        except (ImportError, OSError, ValueError, TypeError):
+            # Columns pyarrow cannot store (e.g. mixed types) only cost the cache
+            pass
+
+    return data
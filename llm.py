@@ -0,0 +1,555 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+OLLAMA_URL = "http://localhost:11434/api/generate"
+MODEL = "deepseek-r1:8b"
+TEMPERATURE = 0.01
+
+PROMPT_TEMPLATE = """
+Eres un asistente encargado de analizar comentarios de estudiantes sobre profesores y asignaturas.
+Tu tarea es leer los siguientes comentarios y generar un resumen conciso de los puntos clave mencionados.
+
+**Instrucción Importante: La respuesta DEBE estar escrita exclusivamente en español.**
+
+Comentarios de los estudiantes para el docente {docente} en la asignatura {asignatura}:
+{comentarios}
+
+**Recuerda: La respuesta DEBE estar escrita exclusivamente en español.**
+
+Resumen de los comentarios de los estudiantes sobre el docente para la asignatura:
+"""
+
+# Sections with more comments than fit in one prompt are summarized in chunks,
+# and the partial summaries are then combined with this prompt
+REDUCE_PROMPT_TEMPLATE = """
+Eres un asistente encargado de analizar comentarios de estudiantes sobre profesores y asignaturas.
+Los comentarios de los estudiantes para el docente {docente} en la asignatura {asignatura} se resumieron por partes.
+Tu tarea es combinar los siguientes resúmenes parciales en un único resumen conciso de los puntos clave,
+sin repetir ideas.
+
+**Instrucción Importante: La respuesta DEBE estar escrita exclusivamente en español.**
+
+Resúmenes parciales:
+{resumenes}
+
+**Recuerda: La respuesta DEBE estar escrita exclusivamente en español.**
+
+Resumen de los comentarios de los estudiantes sobre el docente para la asignatura:
+"""
+
+HEADERS = {
+    "accept": "application/json",
+    "Content-Type": "application/json"
+}
+
+REQUEST_TIMEOUT = 300  # seconds, long sections take a while on a local model
+MAX_RETRIES = 2
+RETRY_BACKOFF = 0.5  # seconds, doubled after each attempt
+CONCURRENCY = 4
+
+# Comments sent in one prompt, in estimated tokens: larger sections are split
+# so the latency of each call stays bounded however big the class is
+CHUNK_TOKENS = 1500
+CHARS_PER_TOKEN = 4  # rough average of the model's tokenizer on Spanish text
+
+CACHE_PATH = "./cache/llm_summaries.sqlite"
+CACHE_MAX_ENTRIES = 5000
+CACHE_MAX_AGE = 90 * 24 * 3600  # seconds
+
+
+class LLMResponseError(Exception):
+    """The LLM service answered with an error status"""
+
+
+class SummaryCache:
+    """
+    Persistent SQLite store of LLM summaries.
+
+    Entries are keyed by a hash of everything that determines the model output
+    (model, temperature and full prompt), so identical requests are answered
+    from disk across reruns, sessions and processes. Entries older than
+    `max_age` seconds are dropped, and only the `max_entries` most recently
+    used are kept.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES, max_age=CACHE_MAX_AGE):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                "key TEXT PRIMARY KEY, summary TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        # One short-lived connection per call: Streamlit runs sessions on
+        # different threads and bulk generation runs in several processes
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def make_key(model, temperature, prompt):
+        """Return the cache key of one LLM request"""
+        payload = json.dumps([model, temperature, prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the cached summary of `key`, or None"""
+        now = time.time()
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT summary FROM summaries WHERE key = ? AND created >= ?",
+                (key, now - self.max_age)).fetchone()
+            if row is not None:
+                connection.execute(
+                    "UPDATE summaries SET accessed = ? WHERE key = ?", (now, key))
+        return row[0] if row else None
+
+    def set(self, key, summary):
+        """Store `summary` under `key` and evict old entries"""
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, created, accessed) "
+                "VALUES (?, ?, ?, ?)", (key, summary, now, now))
+            connection.execute(
+                "DELETE FROM summaries WHERE created < ?", (now - self.max_age,))
+            connection.execute(
+                "DELETE FROM summaries WHERE key NOT IN ("
+                "SELECT key FROM summaries ORDER BY accessed DESC LIMIT ?)",
+                (self.max_entries,))
+
+    def clear(self):
+        """Remove every entry"""
+        with self._connect() as connection:
+            connection.execute("DELETE FROM summaries")
+
+
+_cache = None
+
+
+def get_cache():
+    """Return the process-wide summary cache"""
+    global _cache
+    if _cache is None:
+        _cache = SummaryCache()
+    return _cache
+
+
+def build_prompt(docente, asignatura, comments):
+    """Build the summarization prompt of one teacher and subject"""
+    return PROMPT_TEMPLATE.format(
+        docente=docente, asignatura=asignatura, comentarios='.'.join(comments))
+
+
+def build_reduce_prompt(docente, asignatura, summaries):
+    """Build the prompt combining the partial summaries of one teacher and subject"""
+    return REDUCE_PROMPT_TEMPLATE.format(
+        docente=docente, asignatura=asignatura, resumenes='\n\n'.join(summaries))
+
+
+def estimate_tokens(text):
+    """Approximate number of model tokens of `text`"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def chunk_comments(comments, max_tokens=CHUNK_TOKENS):
+    """
+    Pack comments, in order, into chunks of at most `max_tokens` tokens.
+
+    A single comment longer than the budget is cut to fit its own chunk.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks = []
+    chunk = []
+    size = 0
+    for comment in comments:
+        comment = str(comment)[:max_chars]
+        tokens = estimate_tokens(comment)
+        if chunk and size + tokens > max_tokens:
+            chunks.append(chunk)
+            chunk = []
+            size = 0
+        chunk.append(comment)
+        size += tokens
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def clean_response(text):
+    """Remove the <think>...</think> reasoning block of the model answer"""
+    return re.sub(r'<think>.*?</think>', '', text, flags=re.DOTALL).strip()
+
+
+def new_session(pool_size=CONCURRENCY):
+    """Return a requests session keeping up to `pool_size` connections alive"""
+    # Only loaded once the model is actually called; cache hits never need it
+    import requests
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _generate(session, prompt, url, timeout, retries):
+    """POST one prompt, retrying connection errors, timeouts and 5xx answers"""
+    import requests
+
+    payload = {
+        "model": MODEL,
+        "prompt": prompt,
+        "temperature": TEMPERATURE,
+        "stream": False
+    }
+
+    for attempt in range(retries + 1):
+        try:
+            response = session.post(url, json=payload, headers=HEADERS, timeout=timeout)
+            if response.status_code == 200:
+                return clean_response(json.loads(response.text)["response"])
+            error = LLMResponseError(f"Status code: {response.status_code}")
+            if response.status_code < 500:
+                raise error
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        if attempt < retries:
+            time.sleep(RETRY_BACKOFF * 2 ** attempt)
+    raise error
+
+
+def summarize_comments(docente, asignatura, comments, use_cache=True, session=None, url=None,
+                       timeout=REQUEST_TIMEOUT, retries=MAX_RETRIES):
+    """
+    Summarize the student comments of one teacher and subject with the local LLM.
+
+    Sections whose comments do not fit in CHUNK_TOKENS are summarized by
+    chunks, up to CONCURRENCY of them at once, and the partial summaries are
+    combined in a final call.
+
+    Parameters:
+    -----------
+    docente : str
+        Teacher name
+    asignatura : str
+        Subject name
+    comments : iterable of str
+        Student comments
+    use_cache : bool
+        Read and store the summary in the persistent cache
+    session : requests.Session
+        Session to send the requests with; a new one is used when not given
+    url : str
+        Generate endpoint, OLLAMA_URL by default
+    timeout : float
+        Seconds to wait for the answer of each attempt of each call
+    retries : int
+        Extra attempts after a connection error, timeout or 5xx answer
+
+    Returns:
+    --------
+    str
+        Summary text (markdown), without the model's reasoning block
+
+    Raises:
+    -------
+    LLMResponseError
+        If the service answers with a status other than 200
+    requests.RequestException
+        If the service cannot be reached
+    """
+    async def summarize(session):
+        complete = _completer(session, asyncio.Semaphore(CONCURRENCY), use_cache, url,
+                              timeout, retries)
+        return await complete(await _final_prompt(docente, asignatura, comments, complete))
+
+    if session is None:
+        with new_session(CONCURRENCY) as own_session:
+            return asyncio.run(summarize(own_session))
+    return asyncio.run(summarize(session))
+
+
+def _complete(session, prompt, use_cache, url, timeout, retries):
+    """Answer one prompt, from the persistent cache when possible"""
+    key = SummaryCache.make_key(MODEL, TEMPERATURE, prompt)
+
+    if use_cache:
+        cached = get_cache().get(key)
+        if cached is not None:
+            return cached
+
+    summary = _generate(session, prompt, url or OLLAMA_URL, timeout, retries)
+
+    if use_cache:
+        get_cache().set(key, summary)
+    return summary
+
+
+def _completer(session, semaphore, use_cache, url, timeout, retries):
+    """Return a coroutine function answering one prompt, `semaphore` bounding the calls"""
+    async def complete(prompt):
+        async with semaphore:
+            return await asyncio.to_thread(
+                _complete, session, prompt, use_cache, url, timeout, retries)
+    return complete
+
+
+async def _final_prompt(docente, asignatura, comments, complete):
+    """
+    Return the prompt of the last call summarizing one teacher and subject.
+
+    `comments` come already collapsed (utils.collapse_comments). When they
+    fit in one chunk, that is the whole summarization prompt. Otherwise every
+    chunk is summarized concurrently with `complete` (map) and the prompt combining
+    the partial summaries is returned (reduce); partial summaries that do not
+    fit in one prompt either are combined in groups first.
+    """
+    chunks = chunk_comments(comments)
+    if len(chunks) <= 1:
+        return build_prompt(docente, asignatura, chunks[0] if chunks else [])
+
+    partials = await asyncio.gather(
+        *(complete(build_prompt(docente, asignatura, chunk)) for chunk in chunks))
+    while True:
+        groups = chunk_comments(partials)
+        # One group left, or summaries too long to pack two by two: combine them all
+        if len(groups) == 1 or len(groups) == len(partials):
+            return build_reduce_prompt(docente, asignatura, partials)
+        partials = await asyncio.gather(
+            *(complete(build_reduce_prompt(docente, asignatura, group)) for group in groups))
+
+
+def _partial_tag_length(text, tag):
+    """Length of the longest end of `text` that could start `tag`"""
+    for length in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:length]):
+            return length
+    return 0
+
+
+def strip_think_stream(chunks, open_tag="<think>", close_tag="</think>"):
+    """
+    Drop <think>...</think> blocks from a stream of text chunks as they arrive.
+
+    Tags split across chunks are handled by holding back the few characters
+    that could still turn into a tag. Leading whitespace is skipped, as
+    clean_response does for complete answers.
+    """
+    buffer = ""
+    inside = False
+    started = False
+
+    def emit(text):
+        nonlocal started
+        if not started:
+            text = text.lstrip()
+            started = bool(text)
+        return text
+
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            if inside:
+                end = buffer.find(close_tag)
+                if end == -1:
+                    buffer = buffer[len(buffer) - _partial_tag_length(buffer, close_tag):]
+                    break
+                buffer = buffer[end + len(close_tag):]
+                inside = False
+            else:
+                start = buffer.find(open_tag)
+                if start == -1:
+                    keep = _partial_tag_length(buffer, open_tag)
+                    text = emit(buffer[:len(buffer) - keep])
+                    buffer = buffer[len(buffer) - keep:]
+                    if text:
+                        yield text
+                    break
+                text = emit(buffer[:start])
+                if text:
+                    yield text
+                buffer = buffer[start + len(open_tag):]
+                inside = True
+
+    if not inside:
+        text = emit(buffer)
+        if text:
+            yield text
+
+
+def stream_summary(docente, asignatura, comments, use_cache=True, session=None, url=None,
+                   timeout=REQUEST_TIMEOUT):
+    """
+    Stream the summary of one teacher and subject as the model generates it.
+
+    Same requests as summarize_comments, the last one with "stream": True.
+    The NDJSON chunks are decoded as they arrive and the reasoning block is
+    dropped on the fly, so the text can be rendered progressively (e.g. with
+    st.write_stream). For large sections the chunk summaries are generated
+    before anything is yielded. A cached summary is yielded at once; a
+    completed stream is cached.
+
+    Yields:
+    -------
+    str
+        Pieces of the summary text
+
+    Raises:
+    -------
+    LLMResponseError
+        If the service answers with a status other than 200
+    requests.RequestException
+        If the service cannot be reached
+    """
+    own_session = session is None
+    if own_session:
+        session = new_session(CONCURRENCY)
+
+    try:
+        complete = _completer(session, asyncio.Semaphore(CONCURRENCY), use_cache, url,
+                              timeout, MAX_RETRIES)
+        prompt = asyncio.run(_final_prompt(docente, asignatura, comments, complete))
+        key = SummaryCache.make_key(MODEL, TEMPERATURE, prompt)
+
+        if use_cache:
+            cached = get_cache().get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        payload = {
+            "model": MODEL,
+            "prompt": prompt,
+            "temperature": TEMPERATURE,
+            "stream": True
+        }
+        with session.post(url or OLLAMA_URL, json=payload, headers=HEADERS,
+                          timeout=timeout, stream=True) as response:
+            if response.status_code != 200:
+                raise LLMResponseError(f"Status code: {response.status_code}")
+
+            done = False
+
+            def tokens():
+                nonlocal done
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    done = chunk.get("done", False)
+                    yield chunk.get("response", "")
+
+            pieces = []
+            for text in strip_think_stream(tokens()):
+                pieces.append(text)
+                yield text
+    finally:
+        if own_session:
+            session.close()
+
+    if use_cache and done:
+        get_cache().set(key, "".join(pieces).strip())
+
+
+def collect_comment_batches(subject_index, keys):
+    """
+    Gather the comments of several teachers and subjects up front.
+
+    Parameters:
+    -----------
+    subject_index : utils.SubjectIndex
+        Index of the processed survey rows
+    keys : iterable of (docente, asignatura)
+        Teachers and subjects to collect
+
+    Returns:
+    --------
+    dict
+        Mapping of (docente, asignatura) to its list of normalized,
+        deduplicated comments (see SubjectIndex.comments). Subjects without
+        a meaningful comment are left out.
+    """
+    batches = {}
+    for docente, asignatura in keys:
+        comments = subject_index.comments(docente, asignatura)
+        if comments:
+            batches[(docente, asignatura)] = comments
+    return batches
+
+
+async def summarize_all_async(batches, concurrency=CONCURRENCY, use_cache=True, url=None,
+                              timeout=REQUEST_TIMEOUT, retries=MAX_RETRIES):
+    """
+    Summarize many comment batches concurrently.
+
+    At most `concurrency` requests are in flight at once, sharing the
+    connections of one session; the chunk summaries of large sections (see
+    summarize_comments) count against the same limit. The blocking HTTP
+    calls run in worker threads.
+
+    Parameters:
+    -----------
+    batches : dict
+        Mapping of (docente, asignatura) to its comments, as returned by
+        collect_comment_batches
+    concurrency : int
+        Maximum number of simultaneous requests
+
+    The remaining parameters are those of summarize_comments.
+
+    Returns:
+    --------
+    dict
+        Mapping of (docente, asignatura) to its summary, or to the exception
+        raised while summarizing it
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def summarize(key, comments):
+        try:
+            summary = await complete(await _final_prompt(key[0], key[1], comments, complete))
+        except Exception as e:
+            summary = e
+        return key, summary
+
+    with new_session(concurrency) as session:
+        complete = _completer(session, semaphore, use_cache, url, timeout, retries)
+        results = await asyncio.gather(
+            *(summarize(key, comments) for key, comments in batches.items()))
+    return dict(results)
+
+
+def summarize_all(batches, **kwargs):
+    """Blocking wrapper of summarize_all_async"""
+    return asyncio.run(summarize_all_async(batches, **kwargs))
+
+
+def get_summary(summaries, docente, asignatura, comments=None):
+    """
+    Return one summary out of the results of summarize_all.
+
+    The exception stored for a failed batch is raised again, and subjects
+    missing from `summaries` have no summary (None). When `summaries` is None
+    the subject's `comments` are summarized on the spot, unless there are
+    none; they are not used otherwise.
+    """
+    if summaries is None:
+        if comments is None or not len(comments):
+            return None
+        return summarize_comments(docente, asignatura, comments)
+    summary = summaries.get((docente, asignatura))
+    if isinstance(summary, Exception):
+        raise summary
+    return summary
@@ -6,8 +6,8 @@ import plotly.express as px  # pip install plotly-express
 from openpyxl import load_workbook
 import matplotlib.pyplot as plt
 import seaborn as sns
-import pandas as pd
 import utils
+import ingest
 
 def main():
 
@@ -40,8 +40,7 @@ def main():
         st.subheader("Teacher Reports")
         file_name = st.file_uploader("Upload Excel")
         if file_name:
-            xl_file = pd.ExcelFile(file_name)
-            df = pd.read_excel(file_name, engine="openpyxl")
+            df = ingest.read_export(file_name)
             data = utils.process_columns(df)
 
             data_q2 = utils.analyze_data_q2(data)
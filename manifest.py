@@ -0,0 +1,108 @@
+"""
+Manifest of the reports written to an output directory.
+
+For every teacher it records the fingerprint of each (DOCENTE, ASIGNATURA)
+slice of the processed data the report was built from, so a later run on a
+re-uploaded export only rebuilds the teachers whose responses changed.
+"""
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+import charts
+
+MANIFEST_NAME = "manifest.json"
+
+# Bump whenever report_builder or charts change what a report looks like:
+# every report of an older version is rebuilt
+TEMPLATE_VERSION = 1
+
+
+def subject_fingerprint(rows):
+    """Return a content hash of the survey rows of one subject"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(column) for column in rows.columns]).encode("utf-8"))
+    # Categorical columns hash their values, not their codes, so the result
+    # does not depend on the categories present in the rest of the export
+    digest.update(pd.util.hash_pandas_object(rows, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def docente_fingerprints(subject_index):
+    """Return {docente: {asignatura: fingerprint}} of every subject in the index"""
+    fingerprints = {}
+    for docente in subject_index.docentes():
+        rows = subject_index.docente_rows(docente)
+        fingerprints[docente] = {
+            str(asignatura): subject_fingerprint(subject_index.get(docente, asignatura))
+            for asignatura in rows['ASIGNATURA'].unique()
+        }
+    return fingerprints
+
+
+def new_manifest(summaries_model=None, chart_backend=charts.DEFAULT_BACKEND):
+    """
+    Return an empty manifest.
+
+    `summaries_model` is the LLM that wrote the comment summaries, None when
+    the reports have none, and `chart_backend` the one that drew the charts;
+    reports built another way are never reused.
+    """
+    return {"template_version": TEMPLATE_VERSION, "summaries_model": summaries_model,
+            "chart_backend": chart_backend, "docentes": {}}
+
+
+def load_manifest(output_dir, summaries_model=None, chart_backend=charts.DEFAULT_BACKEND):
+    """
+    Return the manifest of `output_dir`.
+
+    An empty manifest is returned when there is none, when it cannot be read,
+    or when it was written by another template version, summaries model or
+    chart backend.
+    """
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return new_manifest(summaries_model, chart_backend)
+
+    # Manifests older than the chart backends were all drawn with matplotlib
+    if (manifest.get("template_version") != TEMPLATE_VERSION
+            or manifest.get("summaries_model") != summaries_model
+            or manifest.get("chart_backend", "matplotlib") != chart_backend):
+        return new_manifest(summaries_model, chart_backend)
+    manifest.setdefault("docentes", {})
+    return manifest
+
+
+def save_manifest(output_dir, manifest):
+    """Write the manifest atomically next to the reports"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+def stale_docentes(manifest, fingerprints, exists=None):
+    """
+    Return the teachers of `fingerprints` whose report must be rebuilt.
+
+    A report is reused only when the manifest records exactly the same
+    subject fingerprints for the teacher and `exists(file)` confirms the
+    previous report is still in the output store.
+    """
+    stale = []
+    for docente, subjects in fingerprints.items():
+        entry = manifest["docentes"].get(str(docente))
+        if (entry is None or entry.get("subjects") != subjects
+                or (exists is not None and not exists(entry.get("file")))):
+            stale.append(docente)
+    return stale
+
+
+def record(manifest, docente, subjects, file):
+    """Record the report of `docente` built from `subjects` fingerprints"""
+    manifest["docentes"][str(docente)] = {"file": file, "subjects": subjects}
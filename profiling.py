@@ -0,0 +1,129 @@
+"""
+Stage timers and optional profilers for report generation.
+
+StageTimer accumulates the wall time of named stages (chart drawing, PNG
+encoding, doc.build...) so every report can tell where its time went.
+Profile wraps cProfile or pyinstrument behind one switch for the cases a
+timing summary is not detailed enough.
+"""
+import contextlib
+import cProfile
+import importlib.util
+import io
+import pstats
+import time
+
+# pyinstrument is optional: only offered when it is installed
+PROFILERS = ("cprofile",) + (
+    ("pyinstrument",) if importlib.util.find_spec("pyinstrument") is not None else ())
+
+
+class StageTimer:
+    """Wall time and number of calls of each named stage"""
+
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+
+    @contextlib.contextmanager
+    def span(self, stage):
+        """Time the enclosed block as one call of `stage`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def add(self, stage, seconds, calls=1):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+        self.calls[stage] = self.calls.get(stage, 0) + calls
+
+    def merge(self, summary):
+        """Add the stages of another timer's summary()"""
+        for stage, (seconds, calls) in summary.items():
+            self.add(stage, seconds, calls)
+
+    def summary(self):
+        """Return {stage: (seconds, calls)}, picklable and JSON-serializable"""
+        return {stage: (round(seconds, 6), self.calls[stage])
+                for stage, seconds in self.seconds.items()}
+
+    def total(self):
+        return sum(self.seconds.values())
+
+
+class Profile:
+    """
+    Profile a block with cProfile or pyinstrument.
+
+    Does nothing when `kind` is None, so callers can always use it as a
+    context manager and let a flag decide whether to profile:
+
+        with Profile(args.profile) as profile:
+            ...
+        profile.save("report.prof")
+    """
+
+    def __init__(self, kind=None):
+        if kind == "pyinstrument" and kind not in PROFILERS:
+            raise ValueError("pyinstrument is not installed: pip install pyinstrument")
+        if kind not in (None,) + PROFILERS:
+            raise ValueError(f"Unknown profiler {kind!r}, expected one of {PROFILERS}")
+        self.kind = kind
+        self._profiler = None
+        self._running = False
+
+    @property
+    def suffix(self):
+        return ".html" if self.kind == "pyinstrument" else ".prof"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    def start(self):
+        """Start profiling; prefer the context manager where the code allows it"""
+        if self._running:
+            return
+        if self.kind == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.kind == "pyinstrument":
+            from pyinstrument import Profiler
+            self._profiler = Profiler()
+            self._profiler.start()
+        self._running = self.kind is not None
+
+    def stop(self):
+        """Stop profiling; does nothing when not running"""
+        if not self._running:
+            return
+        if self.kind == "cprofile":
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+        self._running = False
+
+    def text(self, limit=30):
+        """Return a text report of the `limit` most expensive calls"""
+        if self._profiler is None:
+            return ""
+        if self.kind == "pyinstrument":
+            return self._profiler.output_text()
+        output = io.StringIO()
+        pstats.Stats(self._profiler, stream=output).sort_stats("cumulative").print_stats(limit)
+        return output.getvalue()
+
+    def save(self, path):
+        """Write the profile: pstats data for cProfile, HTML for pyinstrument"""
+        if self._profiler is None:
+            return
+        if self.kind == "pyinstrument":
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self._profiler.output_html())
+        else:
+            self._profiler.dump_stats(path)
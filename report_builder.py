@@ -0,0 +1,407 @@
+"""
+Build the PDF report of one teacher from precomputed survey aggregates.
+
+Nothing here talks to Streamlit or to the LLM: callers pass the rating
+summary, the subject index and the comment summaries, and receive the PDF
+bytes. Messages are sent to a `notify(level, message, comments=None)`
+callback and progress to `progress_callback(done, total, asignatura)`, so
+the same builder serves the dashboard, the command line and worker
+processes. The time spent in each stage can be collected with a
+profiling.StageTimer.
+"""
+import io
+import os
+from datetime import datetime
+
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import Paragraph, Spacer, Image, Table, TableStyle, PageBreak
+from reportlab.lib.units import inch
+from reportlab.platypus import BaseDocTemplate, PageTemplate, Frame
+
+import charts
+import llm
+import profiling
+import report_template
+import utils
+
+
+def _ignore(level, message, comments=None):
+    pass
+
+
+def _chart(kind, frame, docente, asignatura, width, height, chart_backend, timer):
+    """Return the centered flowable of one chart, drawn with `chart_backend`"""
+    if chart_backend == 'reportlab':
+        with timer.span("charts"):
+            flowable = charts.chart_drawing(kind, frame, docente, asignatura, width, height)
+    else:
+        # Draw on the reusable chart, then encode it as a PNG
+        with timer.span("charts"):
+            fig = charts.MATPLOTLIB_CHARTS[kind](frame, docente, asignatura)
+        with timer.span("savefig"):
+            flowable = Image(utils.figure_to_buffer(fig), width=width, height=height)
+    flowable.hAlign = 'CENTER'  # Center the image
+    return flowable
+
+
+def build_teacher_report(docente, docente_data, subject_index, summaries=None, notify=None,
+                         progress_callback=None, timer=None, chart_backend=charts.DEFAULT_BACKEND):
+    """
+    Build the PDF report of one teacher.
+
+    Parameters:
+    -----------
+    docente : str
+        The teacher
+    docente_data : pandas.DataFrame
+        The teacher's rows of the rating summary (output of utils.analyze_data_q2)
+    subject_index : utils.SubjectIndex
+        Index of the survey rows, holding at least the teacher's rows
+    summaries : dict
+        Comment summary of each (docente, asignatura), as returned by
+        llm.summarize_all; subjects missing from it get no summary
+    notify : callable
+        Called as notify(level, message, comments) with level 'error' or
+        'info'; `comments` holds the raw comments of a failed summary
+    progress_callback : callable
+        Called as progress_callback(done, total, asignatura) after each subject
+    timer : profiling.StageTimer
+        Receives the time spent drawing the charts ('charts'), encoding them
+        ('savefig'), converting the summaries ('summary') and laying out the
+        document ('doc_build')
+    chart_backend : str
+        'matplotlib' to embed the charts as PNG images, 'reportlab' to draw
+        them as vector graphics (see charts.CHART_BACKENDS)
+
+    Returns:
+    --------
+    bytes
+        The PDF, or None when it could not be built
+    """
+    if notify is None:
+        notify = _ignore
+    if summaries is None:
+        summaries = {}
+    if timer is None:
+        timer = profiling.StageTimer()
+    total = len(docente_data)
+
+    buffer = io.BytesIO()
+    page_width, page_height = letter
+    margin = 0.75 * inch
+    content_width = page_width - (2 * margin)
+    try:
+        # doc = SimpleDocTemplate(buffer, pagesize=letter)
+
+        doc = BaseDocTemplate(
+            buffer,
+            pagesize=letter,
+            topMargin=1.25*inch,  # Increased top margin to make room for header
+            bottomMargin=0.75*inch,
+            leftMargin=margin,
+            rightMargin=margin
+        )
+        # Define a frame for the page content
+        content_frame = Frame(
+            doc.leftMargin,
+            doc.bottomMargin,
+            doc.width,
+            doc.height - 0.5*inch,  # Adjust height to account for header
+            id='content'
+        )
+
+        template = PageTemplate(
+            id='custom_template',
+            frames=content_frame,
+            onPage=utils.add_header
+        )
+
+        # Add the template to the document
+        doc.addPageTemplates(template)
+
+        style = report_template.styles()
+        elements = []
+
+        # Add title and header
+        elements.append(
+            Paragraph(f"Evaluación Docente: {docente}", style['title']))
+
+        elements.append(Spacer(1, 0.25*inch))
+        for (teacher, asignatura), row in docente_data.iterrows():
+            docente_asignatura_data = subject_index.get(docente, asignatura)
+            num_responses = len(docente_asignatura_data)
+
+            elements.append(Paragraph(
+                f"<b>Asignatura:</b> {asignatura}. <b>Respuestas:</b> {num_responses} estudiantes.", style['normal']))
+            elements.append(Spacer(1, 0.15*inch))
+
+        elements.append(Paragraph(
+            f"Generado el: {datetime.now().strftime('%d de %B de %Y')}", style['italic']))
+        elements.append(Spacer(1, 0.2*inch))
+        elements.extend(report_template.block('welcome'))
+
+        # 1. Introduction section
+        # elements.append(Paragraph("Introducción", section_style))
+        # elements.append(Paragraph(
+        #     f"Este informe presenta los resultados de la evaluación docente para {docente}. "
+        #     "La evaluación fue realizada por los estudiantes a través de encuestas estandarizadas "
+        #     "que evalúan diferentes aspectos del desempeño docente.",
+        #     styles['Normal']
+        # ))
+        # elements.append(Spacer(1, 0.15*inch))
+
+        # 2. Resultados de la evaluacion section
+        elements.extend(report_template.block('criteria'))
+
+        # Add Niveles de logro section
+        # elements.append(Paragraph("Niveles de logro:", section_style))
+
+        # achievement_levels = [
+        #     ("Excelente", "green", "El docente demuestra un dominio excepcional en este criterio. Cumple y supera consistentemente las expectativas establecidas, garantizando una experiencia de aprendizaje óptima para los estudiantes. Se observa un impacto positivo y sostenido, promoviendo un entorno académico motivador y efectivo."),
+        #     ("Bueno", "blue", "El docente cumple adecuadamente con este criterio, mostrando un desempeño sólido y constante. Aunque puede haber oportunidades de mejora, su impacto en el proceso de enseñanza-aprendizaje es favorable y responde a las expectativas de calidad académica."),
+        #     ("Regular", "orange", "El docente muestra cumplimiento parcial en este criterio, con áreas de mejora evidentes. Su desempeño es funcional, pero presenta inconsistencias que pueden afectar la experiencia educativa de los estudiantes. Se recomienda un plan de acompañamiento o estrategias de fortalecimiento."),
+        #     ("Algo Deficiente", "red", "Se identifican debilidades significativas en este criterio, impactando negativamente en la dinámica de enseñanza-aprendizaje. El docente requiere intervención y apoyo inmediato para optimizar su desempeño y garantizar una mejor experiencia académica para los estudiantes."),
+        #     ("Totalmente Deficiente", "red", "El docente no cumple con las expectativas mínimas en este criterio, lo que compromete la calidad del proceso educativo. Es imprescindible un plan de mejora urgente, con acciones correctivas específicas y seguimiento continuo.")
+        # ]
+
+        # for level, color, description in achievement_levels:
+        #     elements.append(Paragraph(
+        #         f"<b><font color='{color}'>{level}:</font></b> {description}",
+        #         ParagraphStyle(
+        #             'LevelStyle', parent=styles['Normal'], spaceAfter=10, leftIndent=10)
+        #     ))
+
+        # elements.append(Spacer(1, 0.2*inch))
+
+        # # Add UCB logo/image
+        # try:
+        #     elements.append(Paragraph("UCB Teacher Evaluation System",
+        #                               ParagraphStyle(
+        #                                   'MidTitle',
+        #                                   parent=styles['Heading3'],
+        #                                   alignment=1,  # Center
+        #                                   textColor=colors.darkblue
+        #                               )))
+
+        #     image_path = "/Users/josejesuscp/Workspace/reports-ucb/output.png"
+        #     if os.path.exists(image_path):
+        #         elements.append(Spacer(1, 0.2*inch))
+        #         img = Image(image_path, width=5*inch)
+        #         img.hAlign = 'CENTER'  # Center the image
+        #         elements.append(img)
+        #         elements.append(Spacer(1, 0.2*inch))
+        # except Exception as e:
+        #     elements.append(
+        #         Paragraph(f"Could not add image: {str(e)}", styles['Normal']))
+
+        # Add a separator
+        elements.extend(report_template.block('separator'))
+
+        # For each subject, add the specific sections
+        for done, ((teacher, asignatura), row) in enumerate(docente_data.iterrows(), start=1):
+            elements.append(PageBreak())
+
+            docente_asignatura_data = subject_index.get(docente, asignatura)
+
+            # Add subject heading
+            elements.append(
+                Paragraph(f"Asignatura: {asignatura}", style['subject']))
+            elements.append(Spacer(1, 0.1*inch))
+
+            # Plan de Asignatura heading and explanation
+            elements.extend(report_template.block('plan'))
+
+            if 'plan_asignatura' in docente_asignatura_data.columns:
+                plan_counts = docente_asignatura_data['plan_asignatura'].value_counts(
+                ).sort_index()
+
+                max_img_width = content_width * 0.9
+
+                elements.append(Spacer(1, 0.2*inch))
+                elements.append(_chart('plan', plan_counts, docente, asignatura,
+                                       max_img_width * 0.8, 0.6*content_width,
+                                       chart_backend, timer))
+                elements.append(Spacer(1, 0.2*inch))
+
+            elements.append(PageBreak())
+
+            # Desempeño Docente heading, explanation and its factors
+            elements.extend(report_template.block('performance'))
+
+            ratings = row.unstack()
+
+            # Plot the data
+            max_img_width = content_width * 0.9
+
+            elements.append(Spacer(1, 0.2*inch))
+            elements.append(_chart('rating', ratings, docente, asignatura,
+                                   max_img_width * 0.8, 0.6*content_width,
+                                   chart_backend, timer))
+            elements.append(Spacer(1, 0.2*inch))
+
+            elements.append(PageBreak())
+
+            elements.extend(report_template.block('general'))
+
+            # Count occurrences of each rating in evaluacion_docente_general
+            if 'evaluacion_docente_general' in docente_asignatura_data.columns:
+                general_eval_counts = docente_asignatura_data['evaluacion_docente_general'].value_counts(
+                ).sort_index()
+
+                max_img_width = content_width * 0.9
+
+                elements.append(Spacer(1, 0.2*inch))
+                elements.append(_chart('general', general_eval_counts, docente, asignatura,
+                                       max_img_width * 0.8, 0.6*content_width,
+                                       chart_backend, timer))
+                elements.append(Spacer(1, 0.2*inch))
+
+            elements.append(PageBreak())
+
+            elements.extend(report_template.block('summary'))
+
+            if 'comentarios' in subject_index.data.columns:
+                try:
+                    # Get all comments for this teacher and subject
+                    docente_comments = docente_asignatura_data['comentarios'].dropna()
+
+                    if not docente_comments.empty:
+                        try:
+                            # Summaries are computed up front: the comments
+                            # are not collapsed again for every report
+                            cleaned_response = llm.get_summary(summaries, docente, asignatura)
+
+                            if cleaned_response is not None:
+                                with timer.span("summary"):
+                                    formatted_html = utils.markdown_to_reportlab_html(
+                                        cleaned_response)
+
+                                elements.append(Paragraph(
+                                    formatted_html,
+                                    style['explanation']
+                                ))
+
+                        except llm.LLMResponseError as e:
+                            # Still show the raw comments
+                            notify("error", f"Failed to generate summary. {e}",
+                                   comments=docente_comments)
+                        except Exception as e:
+                            notify("error", f"Error connecting to local LLM API: {e}")
+                            # Show raw comments as fallback
+                            notify("info",
+                                   f"Make sure your local LLM service is running at {llm.OLLAMA_URL}",
+                                   comments=docente_comments)
+                    else:
+                        notify("info",
+                               "No comments available for this teacher and subject.")
+                except Exception as e:
+                    notify("error", f"Error processing comments: {e}")
+            else:
+                notify("info", "No 'comentarios' column found in the data.")
+
+            elements.append(Spacer(1, 0.2*inch))
+
+            if progress_callback:
+                progress_callback(done, total, asignatura)
+
+            # Add signature section with space for signatures
+        elements.append(Spacer(1, 1*inch))  # Space for signatures
+
+        # Try to load signature images
+        vany_signature_path = "./signature/vany_signature.png"
+        patricia_signature_path = "./signature/patricia_signature.jpeg"
+
+        # Check if signature images exist - if not, use default signatures (lines)
+        has_vany_signature = os.path.exists(vany_signature_path)
+        has_patricia_signature = os.path.exists(patricia_signature_path)
+
+        # Create a 2x2 table for signatures with images
+        if has_vany_signature or has_patricia_signature:
+            # If we have at least one signature image
+            signature_data = []
+
+            # First row with images or lines
+            signature_row1 = []
+
+            # For Vany's signature
+            if has_vany_signature:
+                # Create an Image object for the signature
+                vany_img = Image(vany_signature_path,
+                                 width=2*inch, height=0.75*inch)
+                vany_img.hAlign = 'CENTER'
+                signature_row1.append(vany_img)
+            else:
+                signature_row1.append('________________________')
+
+            # For Patricia's signature
+            if has_patricia_signature:
+                # Create an Image object for the signature
+                patricia_img = Image(
+                    patricia_signature_path, width=2*inch, height=0.75*inch)
+                patricia_img.hAlign = 'CENTER'
+                signature_row1.append(patricia_img)
+            else:
+                signature_row1.append('________________________')
+
+            signature_data.append(signature_row1)
+
+            # Second row with names and titles
+            signature_data.append([
+                '\nLic. Vany Rosales \nEncargada de Calidad Academica',
+                'VoBo Lic. Patricia Cabrera\nJefe del Departamento de Diseño Curricular y \nCalidad Académica a.i.'
+            ])
+
+        else:
+            # Default behavior (just lines + text)
+            signature_data = [
+                ['________________________', '________________________'],
+                ['\nLic. Vany Rosales \nEncargada de Calidad Academica',
+                 'VoBo Lic. Patricia Cabrera\nJefe del Departamento de Diseño Curricular y \nCalidad Académica a.i.']
+            ]
+
+        # Create and style the signature table
+        signature_table = Table(signature_data, colWidths=[
+                                2.75*inch, 2.75*inch])
+
+        # Apply styling to the table
+        table_style = [
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, 0), 'BOTTOM'),  # Align images at bottom
+            ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
+            # Add padding between image and text
+            ('TOPPADDING', (0, 1), (-1, 1), 10),
+        ]
+
+        signature_table.setStyle(TableStyle(table_style))
+        elements.append(signature_table)
+
+        # # Add signature section for two people
+        # elements.append(Spacer(1, 1*inch))  # Space for signatures
+
+        # # Create a table for signatures
+        # signature_data = [
+        #     ['________________________', '________________________'],
+        #     ['\nLic. Vany Rosales \n Encargada de Calidad Academica',
+        #      'VoBo Lic. Patricia Cabrera\n Jefe del Departamento de Diseño Curricular y \n Calidad Académica a.i.']
+        # ]
+        # signature_table = Table(signature_data, colWidths=[
+        #                         2.75*inch, 2.75*inch])
+        # signature_table.setStyle(TableStyle([
+        #     ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        #     ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
+        # ]))
+        # elements.append(signature_table)
+
+        # Build the PDF
+        with timer.span("doc_build"):
+            doc.build(elements)
+
+        # Get the PDF content
+        pdf_bytes = buffer.getvalue()
+        buffer.close()
+
+        return pdf_bytes
+    except Exception as e:
+        notify("error", f"Error generating PDF with reportlab: {e}")
+        buffer.close()
+        return None
@@ -0,0 +1,172 @@
+"""
+Static parts of the teacher report: paragraph styles and boilerplate text.
+
+Styles and the parsed boilerplate paragraphs are built once per process and
+shared by every report; report_builder only creates the flowables that
+depend on the teacher's data. Blocks are handed out as shallow copies, so
+ReportLab can lay them out (and split them across pages) in any number of
+documents without touching the cached originals.
+"""
+import copy
+import functools
+
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, Spacer
+
+WELCOME_TEXT = (
+    "La evaluación inicial del desempeño docente es una herramienta fundamental para asegurar la calidad académica, "
+    "ya que permite identificar fortalezas y áreas de mejora en las prácticas pedagógicas desde el inicio del semestre. "
+    "Este proceso no solo impulsa el desarrollo profesional del docente, sino que también fortalece la experiencia de "
+    "aprendizaje de los estudiantes, promoviendo un entorno académico de excelencia y fomentando la mejora continua en "
+    "los métodos de enseñanza. "
+    "Le invitamos a tomar este reporte con una actitud abierta y positiva, viéndolo como una oportunidad para reflexionar "
+    "sobre su práctica docente y potenciar aún más su impacto en la formación de los estudiantes."
+)
+
+CRITERIA = [
+    "Presentación del Plan de Asignatura.",
+    "Puntualidad y cumplimiento de horario.",
+    "Ambiente de respeto y cordialidad.",
+    "Disponibilidad para resolver dudas.",
+    "Organización y estructura de la clase.",
+    "Aplicación de estrategias didácticas.",
+    "Claridad en la enseñanza.",
+    "Asignación de tareas y actividades académicas.",
+    "Calidad de la retroalimentación.",
+    "Evaluación general del docente."
+]
+
+PLAN_TEXT = (
+    "La presentación del Plan de Asignatura al inicio del curso es clave para que los estudiantes comprendan los contenidos, metodologías y criterios de evaluación. "
+    "Les brinda una guía clara para organizar el aprendizaje y mejorar el desempeño académico. "
+    "Cuando esta presentación no se realiza o no queda suficientemente clara, puede generar incertidumbre, afectar la organización de los estudiantes "
+    "y dificultar la alineación de expectativas entre docentes y estudiantes, lo que impacta en el desarrollo de la asignatura. "
+    "Asimismo, es importante considerar que las respuestas con la opción \"Desconozco\" pueden deberse a que algunos estudiantes no asistieron "
+    "a las primeras clases o no recuerdan este momento específico. Esto no implica necesariamente que el plan no se haya presentado, "
+    "pero resalta la importancia de reforzar esta información en distintos momentos del semestre."
+)
+
+PERFORMANCE_TEXT = (
+    "El Desempeño Docente es un aspecto clave en la calidad del proceso de enseñanza-aprendizaje, ya que impacta directamente en la experiencia académica de los estudiantes. "
+    "Este criterio abarca diversos factores que contribuyen a un entorno educativo efectivo y enriquecedor, entre ellos:"
+)
+
+# Criteria of question 2 and what each one covers
+PERFORMANCE_FACTORS = [
+    ("Puntualidad y cumplimiento de horario", "Asistencia y respeto por los tiempos establecidos."),
+    ("Ambiente de respeto y cordialidad", "Clima de confianza y trato adecuado hacia los estudiantes."),
+    ("Disponibilidad para resolver dudas", "Disposición para atender inquietudes y facilitar la comprensión de los temas."),
+    ("Organización y estructura de la clase", "Desarrollo ordenado y secuencial de los contenidos."),
+    ("Aplicación de estrategias didácticas", "Uso de metodologías adecuadas para facilitar el aprendizaje."),
+    ("Claridad en la enseñanza", "Explicaciones comprensibles y coherentes."),
+    ("Asignación de tareas y actividades académicas", "Diseño de actividades que refuercen los aprendizajes."),
+    ("Calidad de la retroalimentación", "Comentarios oportunos y pertinentes para la mejora del desempeño estudiantil."),
+]
+
+PERFORMANCE_CLOSING = "A continuación, se detallan los resultados obtenidos en cada uno de estos criterios."
+
+GENERAL_TEXT = (
+    "La percepción de los estudiantes sobre el desempeño docente es un indicador importante de la calidad del proceso de enseñanza-aprendizaje. "
+    "A través de este indicador, se busca conocer de manera global cómo valoran la labor del docente en función de su metodología, "
+    "interacción con los estudiantes y claridad en la enseñanza. "
+    "Las respuestas obtenidas reflejan el impacto del docente en la experiencia académica y permiten identificar fortalezas, "
+    "así como oportunidades de mejora. A continuación, se presentan los resultados de esta valoración general."
+)
+
+
+@functools.lru_cache(maxsize=None)
+def styles():
+    """Return the report's paragraph styles by name, built once per process"""
+    sample = getSampleStyleSheet()
+    return {
+        'normal': sample['Normal'],
+        'italic': sample['Italic'],
+        'title': ParagraphStyle(
+            'Title',
+            parent=sample['Heading1'],
+            alignment=1,  # Center
+            textColor=colors.darkblue,
+            spaceAfter=0.3*inch
+        ),
+        'section': ParagraphStyle(
+            'Section',
+            parent=sample['Heading2'],
+            textColor=colors.darkblue,
+            spaceBefore=0.2*inch,
+            spaceAfter=0.1*inch
+        ),
+        'explanation': ParagraphStyle(
+            'ExplanationText',
+            parent=sample['Normal'],
+            spaceBefore=0.1*inch,
+            spaceAfter=0.2*inch,
+            alignment=4  # 4 is for fully justified text
+        ),
+        'subject': ParagraphStyle(
+            'SubjectTitle',
+            parent=sample['Heading2'],
+            textColor=colors.darkblue,
+            borderColor=colors.darkblue,
+            borderWidth=1,
+            borderPadding=5,
+            borderRadius=2,
+            spaceAfter=0.2*inch
+        ),
+        'criterion': ParagraphStyle('BulletStyle', parent=sample['Normal'], leftIndent=20),
+        'bullet': ParagraphStyle(
+            'BulletStyle', parent=sample['Normal'], leftIndent=20, spaceBefore=0.05*inch),
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def _blocks():
+    style = styles()
+    return {
+        'welcome': [
+            Paragraph("<b>Estimado/a Docente:</b>", style['normal']),
+            Paragraph(WELCOME_TEXT, style['explanation']),
+            Spacer(1, 0.1*inch),
+        ],
+        'criteria': [
+            Paragraph("Resultados de la Evaluación", style['section']),
+            Paragraph(
+                "En base a las respuestas de los estudiantes, se presentan los hallazgos agrupados en los siguientes criterios:",
+                style['normal']),
+        ] + [Paragraph(f"• {criterion}", style['criterion']) for criterion in CRITERIA] + [
+            Spacer(1, 0.2*inch),
+        ],
+        'separator': [
+            Paragraph("<hr/>", style['normal']),
+            Spacer(1, 0.2*inch),
+        ],
+        'plan': [
+            Paragraph("Plan de Asignatura", style['section']),
+            Paragraph(PLAN_TEXT, style['explanation']),
+        ],
+        'performance': [
+            Paragraph("Desempeño del Docente", style['section']),
+            Paragraph(PERFORMANCE_TEXT, style['explanation']),
+        ] + [Paragraph(f"• <b>{factor}:</b> {description}", style['bullet'])
+             for factor, description in PERFORMANCE_FACTORS] + [
+            Paragraph(PERFORMANCE_CLOSING, style['explanation']),
+        ],
+        'general': [
+            Paragraph("Evaluación General del Desempeño Docente", style['section']),
+            Paragraph(GENERAL_TEXT, style['explanation']),
+        ],
+        'summary': [
+            Paragraph("Resumen Generado por IA", style['section']),
+        ],
+    }
+
+
+def block(name):
+    """
+    Return fresh copies of the flowables of a static block.
+
+    Blocks: 'welcome', 'criteria', 'separator', 'plan', 'performance',
+    'general' and 'summary' (the heading of the AI summary).
+    """
+    return [copy.copy(flowable) for flowable in _blocks()[name]]
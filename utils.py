@@ -1,92 +1,400 @@
 import pandas as pd
+import numpy as np
 import os
-import markdown
-from reportlab.lib.units import inch
-
-# Add a variable to store the latest data
-_latest_data = None
+import io
+import functools
+
+# Long survey headers of the export and the short names used in the code
+COLUMN_RENAME_MAPPING = {
+    "1. EN LA PRIMERA SEMANA DE CLASES, ¿EL DOCENTE PRESENTÓ Y EXPLICÓ SU PLAN DE ASIGNATURA?": "plan_asignatura",
+    '2. VALORA EL DESEMPEÑO DEL DOCENTE CON RELACIÓN A LOS SIGUIENTES CREITERIOS: [Es puntual y cumple con el horario de clase.]': 'puntualidad',
+    '2. VALORA EL DESEMPEÑO DEL DOCENTE CON RELACIÓN A LOS SIGUIENTES CREITERIOS: [Promueve un ambiente cordial y de respeto mutuo.]': 'ambiente',
+    '2. VALORA EL DESEMPEÑO DEL DOCENTE CON RELACIÓN A LOS SIGUIENTES CREITERIOS: [Demuestra disponibilidad y apertura para responder a dudas y/o consultas.]': 'disponibilidad',
+    '2. VALORA EL DESEMPEÑO DEL DOCENTE CON RELACIÓN A LOS SIGUIENTES CREITERIOS: [Cumple con la planificación de la clase.]': 'planificación',
+    '2. VALORA EL DESEMPEÑO DEL DOCENTE CON RELACIÓN A LOS SIGUIENTES CREITERIOS: [El desarrollo de la clase es ordenado, estructurado y se relaciona con lo avanzado.]': 'desarrollo',
+    '2. VALORA EL DESEMPEÑO DEL DOCENTE CON RELACIÓN A LOS SIGUIENTES CREITERIOS: [Aplica estrategias y técnicas que ayudan a comprender mejor los contenidos.]': 'estrategias',
+    '2. VALORA EL DESEMPEÑO DEL DOCENTE CON RELACIÓN A LOS SIGUIENTES CREITERIOS: [Sus explicaciones son claras y refuerzan lo aprendido.]': 'claridad',
+    '2. VALORA EL DESEMPEÑO DEL DOCENTE CON RELACIÓN A LOS SIGUIENTES CREITERIOS: [Asigna tareas y/o actividades que me preparan para tener un rendimiento satisfactorio en la asignatura.]': 'tareas',
+    '2. VALORA EL DESEMPEÑO DEL DOCENTE CON RELACIÓN A LOS SIGUIENTES CREITERIOS: [Constantemente brinda retroalimentación/información precisa, oportuna y constructiva de mis logros, fortalezas, debilidades y aspectos a mejorar, que me ayudan a progresar en mi desempeño académico.]': 'retroalimentación',
+    "3. EN GENERAL, ¿CÓMO EVALUARÍAS EL DESEMPEÑO DEL DOCENTE?": "evaluacion_docente_general",
+    "4. MENCIONA ASPECTOS POSITIVOS Y/O ASPECTOS EN LOS QUE EL DOCENTE NECESITA TRABAJAR PARA MEJORAR SU DESEMPEÑO.": "comentarios",
+}
+
+# Performance criteria of question 2, in the order they appear in the survey
+RATING_COLUMNS = [
+    'puntualidad',
+    'ambiente',
+    'disponibilidad',
+    'planificación',
+    'desarrollo',
+    'estrategias',
+    'claridad',
+    'tareas',
+    'retroalimentación',
+]
+
+# Answers of the Likert questions, best first. Charts and summaries follow
+# this order; answers not listed here are appended after them.
+RATING_ORDER = [
+    'Excelente',
+    'Bueno',
+    'Regular',
+    'Algo Deficiente',
+    'Deficiente',
+    'Totalmente Deficiente',
+    'Insuficiente',
+]
+
+# Answers of the plan_asignatura question
+PLAN_ORDER = ['Si', 'No', 'Desconozco']
+
+# Comments that say nothing once normalized (lowercase, no punctuation);
+# they are not sent to the LLM
+TRIVIAL_COMMENTS = {
+    '', 'ninguno', 'ninguna', 'ningun', 'nada', 'no', 'na', 'n a', 'ok', 'x', 'sin comentarios',
+    'ningun comentario', 'ninguna observacion', 'sin observaciones', 'ninguna sugerencia',
+}
 
 
 def process_columns(data):
-    """Process the dataframe columns and return a clean version"""
-    global _latest_data
-    # Store the data for later use by get_data()
-    _latest_data = data.copy()
-
-    column_rename_mapping = {
-        "1. EN LA PRIMERA SEMANA DE CLASES, ¿EL DOCENTE PRESENTÓ Y EXPLICÓ SU PLAN DE ASIGNATURA?": "plan_asignatura",
-        '2. VALORA EL DESEMPEÑO DEL DOCENTE CON RELACIÓN A LOS SIGUIENTES CREITERIOS: [Es puntual y cumple con el horario de clase.]': 'puntualidad',
-        '2. VALORA EL DESEMPEÑO DEL DOCENTE CON RELACIÓN A LOS SIGUIENTES CREITERIOS: [Promueve un ambiente cordial y de respeto mutuo.]': 'ambiente',
-        '2. VALORA EL DESEMPEÑO DEL DOCENTE CON RELACIÓN A LOS SIGUIENTES CREITERIOS: [Demuestra disponibilidad y apertura para responder a dudas y/o consultas.]': 'disponibilidad',
-        '2. VALORA EL DESEMPEÑO DEL DOCENTE CON RELACIÓN A LOS SIGUIENTES CREITERIOS: [Cumple con la planificación de la clase.]': 'planificación',
-        '2. VALORA EL DESEMPEÑO DEL DOCENTE CON RELACIÓN A LOS SIGUIENTES CREITERIOS: [El desarrollo de la clase es ordenado, estructurado y se relaciona con lo avanzado.]': 'desarrollo',
-        '2. VALORA EL DESEMPEÑO DEL DOCENTE CON RELACIÓN A LOS SIGUIENTES CREITERIOS: [Aplica estrategias y técnicas que ayudan a comprender mejor los contenidos.]': 'estrategias',
-        '2. VALORA EL DESEMPEÑO DEL DOCENTE CON RELACIÓN A LOS SIGUIENTES CREITERIOS: [Sus explicaciones son claras y refuerzan lo aprendido.]': 'claridad',
-        '2. VALORA EL DESEMPEÑO DEL DOCENTE CON RELACIÓN A LOS SIGUIENTES CREITERIOS: [Asigna tareas y/o actividades que me preparan para tener un rendimiento satisfactorio en la asignatura.]': 'tareas',
-        '2. VALORA EL DESEMPEÑO DEL DOCENTE CON RELACIÓN A LOS SIGUIENTES CREITERIOS: [Constantemente brinda retroalimentación/información precisa, oportuna y constructiva de mis logros, fortalezas, debilidades y aspectos a mejorar, que me ayudan a progresar en mi desempeño académico.]': 'retroalimentación',
-        "3. EN GENERAL, ¿CÓMO EVALUARÍAS EL DESEMPEÑO DEL DOCENTE?": "evaluacion_docente_general",
-        "4. MENCIONA ASPECTOS POSITIVOS Y/O ASPECTOS EN LOS QUE EL DOCENTE NECESITA TRABAJAR PARA MEJORAR SU DESEMPEÑO.": "comentarios",
-    }
-
-    data.rename(columns=column_rename_mapping, inplace=True)
+    """
+    Process the dataframe columns and return a clean version
+
+    The columns are renamed and encoded in place, without copying the rows;
+    get_data gives the result back under the original headers.
+    """
+    data.rename(columns=COLUMN_RENAME_MAPPING, inplace=True)
+    encode_categories(data)
+
+    return data
+
+
+def _ordered_categories(values, order):
+    """Return the distinct values ordered by `order`, unknown values last"""
+    present = set(values.dropna().unique())
+    known = [value for value in order if value in present]
+    return known + sorted(present.difference(order), key=str)
+
+
+def encode_categories(data):
+    """
+    Convert the survey answers and grouping keys to pandas Categoricals in place.
+
+    The Likert columns share one ordered category set following RATING_ORDER,
+    plan_asignatura follows PLAN_ORDER, and DOCENTE and ASIGNATURA become
+    categoricals of their sorted names. Only answers present in the data
+    become categories, so no value is lost and no empty category is added.
+
+    Parameters:
+    -----------
+    data : pandas.DataFrame
+        Survey rows with the short column names of COLUMN_RENAME_MAPPING
+
+    Returns:
+    --------
+    pandas.DataFrame
+        The same dataframe
+    """
+    rating_columns = [column for column in RATING_COLUMNS + ['evaluacion_docente_general']
+                      if column in data.columns]
+    if rating_columns:
+        categories = _ordered_categories(
+            pd.concat([data[column] for column in rating_columns], ignore_index=True), RATING_ORDER)
+        rating_dtype = pd.CategoricalDtype(categories, ordered=True)
+        for column in rating_columns:
+            data[column] = data[column].astype(rating_dtype)
+
+    if 'plan_asignatura' in data.columns:
+        data['plan_asignatura'] = data['plan_asignatura'].astype(pd.CategoricalDtype(
+            _ordered_categories(data['plan_asignatura'], PLAN_ORDER), ordered=True))
+
+    for column in ['DOCENTE', 'ASIGNATURA']:
+        if column in data.columns:
+            data[column] = data[column].astype('category')
 
     return data
 
 
-def get_data():
-    """Return the original dataset."""
-    global _latest_data
-    if _latest_data is None:
-        raise ValueError(
-            "No data has been loaded yet. Please load data first.")
-    return _latest_data
+def get_data(data):
+    """
+    Return processed survey rows under the original headers of the export.
+
+    The result is a shallow copy sharing the rows of `data`: only the column
+    labels differ, nothing is duplicated. The answers keep their categorical
+    dtypes.
+
+    Parameters:
+    -----------
+    data : pandas.DataFrame
+        Output of process_columns, e.g. the one held by the caller's session
+
+    Returns:
+    --------
+    pandas.DataFrame
+        The same rows with the long headers of COLUMN_RENAME_MAPPING
+    """
+    original_headers = {short: header for header, short in COLUMN_RENAME_MAPPING.items()}
+    view = data.copy(deep=False)
+    view.columns = [original_headers.get(column, column) for column in data.columns]
+    return view
+
+
+def count_ratings(data, columns):
+    """
+    Count every rating of `columns` per teacher and subject.
+
+    The counts are computed with one np.bincount per column over integer
+    codes of the groups and ratings, instead of a value_counts per group and
+    column. Categorical columns (see encode_categories) are counted straight
+    from their codes.
+
+    Parameters:
+    -----------
+    data : pandas.DataFrame
+        Processed survey rows (output of process_columns)
+    columns : list
+        Rating columns to count
+
+    Returns:
+    --------
+    tuple
+        (sizes, ratings, counts): the number of rows of each group as a
+        pandas.Series indexed by (DOCENTE, ASIGNATURA), sorted; the
+        pandas.Index of ratings given in any column, in category order for
+        categorical columns and sorted otherwise; and float counts of shape
+        (groups, columns, ratings).
+    """
+    grouped = data.groupby(['DOCENTE', 'ASIGNATURA'], observed=True)
+    group_codes = grouped.ngroup().to_numpy()
+    sizes = grouped.size()
+
+    # Factorize each column on its own, then map the local codes onto one
+    # vocabulary of ratings shared by all columns
+    factorized = [_factorize_ratings(data[column]) for column in columns]
+    if all(isinstance(data[column].dtype, pd.CategoricalDtype) for column in columns):
+        ratings = pd.Index(pd.unique(np.concatenate(
+            [uniques for _, uniques in factorized] or [np.array([], dtype=object)])))
+    else:
+        ratings = pd.Index(sorted(set().union(*(uniques for _, uniques in factorized))))
+
+    n_groups, n_ratings = len(sizes), len(ratings)
+    counts = np.empty((n_groups, len(columns), n_ratings))
+    for position, (codes, uniques) in enumerate(factorized):
+        rating_codes = ratings.get_indexer(uniques)[codes]
+        valid = (group_codes >= 0) & (codes >= 0)
+        counts[:, position, :] = np.bincount(
+            group_codes[valid] * n_ratings + rating_codes[valid],
+            minlength=n_groups * n_ratings).reshape(n_groups, n_ratings)
+
+    # Categories nobody chose are not ratings given
+    given = counts.sum(axis=(0, 1)) > 0
+    return sizes, ratings[given], counts[:, :, given]
 
 
 def analyze_data_q2(data):
-    columns_to_analyze = [
-        'puntualidad',  # puntualidad
-        'ambiente',  # ambiente
-        'disponibilidad',  # disponibilidad
-        'planificación',  # planificación
-        'desarrollo',  # desarrollo
-        'estrategias',  # estrategias
-        'claridad',  # claridad
-        'tareas',  # tareas
-        'retroalimentación',  # retroalimentación
-    ]
+    """
+    Count every rating of the question 2 criteria per teacher and subject.
 
-    rating_summary = data.groupby(['DOCENTE', 'ASIGNATURA'])[columns_to_analyze].apply(
-        lambda group: group.apply(lambda col: col.value_counts()).fillna(0)
-    ).unstack(fill_value=0)
-    return rating_summary
+    See count_ratings, which does the counting.
 
+    Parameters:
+    -----------
+    data : pandas.DataFrame
+        Processed survey rows (output of process_columns)
 
-def save_figure_to_temp(fig, prefix="figure"):
+    Returns:
+    --------
+    pandas.DataFrame
+        Float counts indexed by (DOCENTE, ASIGNATURA), with (criterion, rating)
+        columns. Ratings include every rating given to any criterion, in
+        category order for categorical columns and sorted otherwise.
+    """
+    columns_to_analyze = RATING_COLUMNS
+    sizes, ratings, counts = count_ratings(data, columns_to_analyze)
+    n_ratings = len(ratings)
+
+    # Levels are kept in survey and rating order (from_product would sort
+    # them), so row.unstack() yields the criteria and ratings in that order
+    columns = pd.MultiIndex(
+        levels=[columns_to_analyze, ratings],
+        codes=[np.repeat(np.arange(len(columns_to_analyze)), n_ratings),
+               np.tile(np.arange(n_ratings), len(columns_to_analyze))],
+    )
+    rating_summary = pd.DataFrame(counts.reshape(len(sizes), len(columns)), index=sizes.index,
+                                  columns=columns)
+    # Groups without any rating have no counts to report
+    return rating_summary[counts.sum(axis=(1, 2)) > 0]
+
+
+def _factorize_ratings(column):
+    """Return integer codes (-1 for missing) and the values they refer to"""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy(), column.cat.categories.to_numpy(dtype=object)
+    codes, uniques = pd.factorize(column)
+    return codes, np.asarray(uniques, dtype=object)
+
+
+def normalize_comments(comments):
     """
-    Save a matplotlib figure to a temporary file and return the path.
+    Normalize a column of free-text comments, trivial ones becoming NA.
+
+    Whitespace runs are collapsed, text is lowercased and surrounding
+    punctuation is stripped. A comment is trivial when, without accents and
+    punctuation, it is one of TRIVIAL_COMMENTS ("ninguno", ".", "").
 
     Parameters:
     -----------
-    fig : matplotlib.figure.Figure
-        The figure to save
-    prefix : str
-        Prefix for the filename
-    dpi : int
-        Resolution for the saved image
+    comments : pandas.Series
+        Raw comments, missing values allowed
 
     Returns:
     --------
-    str
-        Path to the saved image file
+    pandas.Series
+        Normalized comments (string dtype), NA where trivial or missing
+    """
+    text, key = _normalize_comments(comments)
+    return text.mask(key.isna() | key.isin(TRIVIAL_COMMENTS))
+
+
+def _normalize_comments(comments):
+    """Return the normalized text of comments and its comment_keys"""
+    text = (comments.astype('string')
+            .str.replace(r'\s+', ' ', regex=True)
+            .str.lower()
+            .str.strip(' .,;:!¡?¿-_*"\''))
+    return text, comment_keys(text)
+
+
+def comment_keys(comments):
+    """
+    Return the accent, punctuation and spacing-insensitive form of comments.
+
+    Comments with the same key say the same thing: "Excelente docente!" and
+    "excelente, docente" are both "excelente docente". Expects lowercase
+    text, e.g. the output of normalize_comments.
+    """
+    return (comments.astype('string')
+            .str.normalize('NFKD')
+            .str.replace('[\u0300-\u036f]', '', regex=True)
+            .str.replace(r'[\W_]+', ' ', regex=True)
+            .str.strip())
+
+
+def collapse_comments(data):
+    """
+    Normalize and deduplicate the comments of every teacher and subject at once.
+
+    Comments of a subject with the same comment_keys are collapsed into
+    one entry: the first of them, carrying the count of all of them, e.g.
+    "todo bien (×14)". Trivial comments are dropped (see
+    normalize_comments). The whole comentarios column is processed in one
+    vectorized pass.
+
+    Parameters:
+    -----------
+    data : pandas.DataFrame
+        Processed survey rows with DOCENTE, ASIGNATURA and comentarios
+
+    Returns:
+    --------
+    dict
+        Mapping of (docente, asignatura) to its list of comments, most
+        repeated first. Subjects without a meaningful comment are left out.
+    """
+    keys = ['DOCENTE', 'ASIGNATURA']
+    text, key = _normalize_comments(data['comentarios'])
+    comments = data[keys].assign(comentario=text, key=key)
+    comments = comments[~(key.isna() | key.isin(TRIVIAL_COMMENTS))]
+    counts = (comments.groupby(keys + ['key'], observed=True, sort=False)
+              .agg(comentario=('comentario', 'first'), count=('comentario', 'size'))
+              .reset_index())
+    # Most repeated first; ties keep the order the comments first appear in
+    counts = counts.sort_values('count', ascending=False, kind='stable')
+    repeated = counts['count'] > 1
+    counts['label'] = counts['comentario'].where(
+        ~repeated, counts['comentario'] + ' (×' + counts['count'].astype('string') + ')')
+    return {key: labels.tolist() for key, labels in
+            counts.groupby(keys, observed=True, sort=False)['label']}
+
+
+class SubjectIndex:
     """
-    # Create a unique filename
-    temp_dir = "./images/"
-    file_path = os.path.join(temp_dir, f"{prefix}.png")
+    Survey rows partitioned by (DOCENTE, ASIGNATURA), built in a single pass.
 
-    # Save the figure to the file
-    fig.savefig(file_path)
+    The data is sorted once on the two keys so every teacher and every
+    subject occupies a contiguous block of rows. Lookups then return a
+    positional slice of that block instead of re-scanning the whole table.
 
-    return file_path
+    Parameters:
+    -----------
+    data : pandas.DataFrame
+        Processed survey rows (output of process_columns)
+    """
+
+    def __init__(self, data):
+        self.data = data.sort_values(['DOCENTE', 'ASIGNATURA'], kind='stable')
+
+        self._subject_offsets = {
+            key: (rows[0], rows[-1] + 1)
+            for key, rows in self.data.groupby(['DOCENTE', 'ASIGNATURA'], sort=False, observed=True).indices.items()
+        }
+        self._docente_offsets = {}
+        for (docente, _), (start, stop) in self._subject_offsets.items():
+            first, _ = self._docente_offsets.get(docente, (start, stop))
+            self._docente_offsets[docente] = (first, stop)
+        self._comments = None
+
+    def get(self, docente, asignatura):
+        """Return the rows of one teacher and subject"""
+        start, stop = self._subject_offsets.get((docente, asignatura), (0, 0))
+        return self.data.iloc[start:stop]
+
+    def docente_rows(self, docente):
+        """Return every row of one teacher"""
+        start, stop = self._docente_offsets.get(docente, (0, 0))
+        return self.data.iloc[start:stop]
+
+    def docentes(self):
+        """Return the teachers present in the data, sorted"""
+        return list(self._docente_offsets)
+
+    def comments(self, docente, asignatura):
+        """
+        Return the normalized, deduplicated comments of one teacher and subject.
+
+        See collapse_comments; the whole column is processed on the first
+        call. Empty when the subject has no meaningful comment.
+        """
+        if self._comments is None:
+            self._comments = (collapse_comments(self.data)
+                              if 'comentarios' in self.data.columns else {})
+        return self._comments.get((docente, asignatura), [])
+
+
+def figure_to_buffer(fig, format="png"):
+    """
+    Render a matplotlib figure into an in-memory buffer.
+
+    The buffer can be handed directly to ReportLab's Image flowable, so
+    reports never write chart files to disk and concurrent sessions cannot
+    overwrite each other's images.
+
+    Parameters:
+    -----------
+    fig : matplotlib.figure.Figure
+        The figure to render
+    format : str
+        Image format passed to savefig
+
+    Returns:
+    --------
+    io.BytesIO
+        Buffer holding the rendered image, positioned at the start
+    """
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=format)
+    buffer.seek(0)
+    return buffer
 
 
 def markdown_to_reportlab_html(markdown_text):
@@ -103,6 +411,7 @@ def markdown_to_reportlab_html(markdown_text):
     str
         HTML formatted text compatible with ReportLab's Paragraph
     """
+    import markdown
 
     # Convert markdown to HTML
     html = markdown.markdown(markdown_text)
@@ -144,25 +453,81 @@ def markdown_to_reportlab_html(markdown_text):
     return html
 
 
+# Header logo and the resolution it is embedded at; the source image is
+# far larger than its printed size
+LOGO_PATH = "./logo/logo.png"
+LOGO_DPI = 300
+HEADER_FORM = "report_header"
+
+
+@functools.lru_cache(maxsize=None)
+def header_logo(path=LOGO_PATH, width=1.5, height=0.7, dpi=LOGO_DPI):
+    """
+    Return the header logo decoded once per process, or None when it is missing.
+
+    Parameters:
+    -----------
+    path : str
+        Image file of the logo
+    width, height : float
+        Box the logo is drawn in, in inches
+    dpi : int
+        Resolution of the returned image at that size
+
+    Returns:
+    --------
+    reportlab.lib.utils.ImageReader
+        The logo downscaled to fit the box at `dpi`, alpha channel included
+    """
+    if not os.path.exists(path):
+        return None
+
+    from PIL import Image
+    from reportlab.lib.utils import ImageReader
+
+    with Image.open(path) as image:
+        image.load()
+        scale = min(width * dpi / image.width, height * dpi / image.height, 1.0)
+        if scale < 1.0:
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.LANCZOS)
+        else:
+            image = image.copy()
+    return ImageReader(image)
+
+
 def add_header(canvas, doc):
-    """Add UCB logo header to each page of the PDF report"""
-    canvas.saveState()
+    """
+    Add UCB logo header to each page of the PDF report
+
+    The header is drawn once per document into a form XObject that every
+    page then references, and the logo itself is decoded once per process
+    (see header_logo).
+    """
+    from reportlab.lib.units import inch
+
+    if not canvas.hasForm(HEADER_FORM):
+        canvas.beginForm(HEADER_FORM)
+        canvas.saveState()
+
+        # Add UCB logo on the top left
+        logo = header_logo()
 
-    # Add UCB logo on the top left
-    logo_path = "./logo/logo.png"
+        if logo is not None:
+            # Draw logo at top left, preserve aspect ratio
+            canvas.drawImage(logo, 0.8*inch, doc.height + 0.5*inch,
+                             width=1.5*inch, height=0.7*inch, preserveAspectRatio=True, mask='auto')
 
-    if os.path.exists(logo_path):
-        # Draw logo at top left, preserve aspect ratio
-        canvas.drawImage(logo_path, 0.8*inch, doc.height + 0.5*inch,
-                         width=1.5*inch, height=0.7*inch, preserveAspectRatio=True, mask='auto')
+        # Add department text on the top right
+        canvas.setFont('Helvetica-Bold', 10)
+        canvas.drawRightString(doc.width + 0.5*inch, doc.height + 0.9*inch,
+                               "Dirección Académica de Sede")
 
-    # Add department text on the top right
-    canvas.setFont('Helvetica-Bold', 10)
-    canvas.drawRightString(doc.width + 0.5*inch, doc.height + 0.9*inch,
-                           "Dirección Académica de Sede")
+        canvas.setFont('Helvetica', 9)
+        canvas.drawRightString(doc.width + 0.5*inch, doc.height + 0.7*inch,
+                               "Departamento de Desarrollo Curricular y Calidad Académica")
 
-    canvas.setFont('Helvetica', 9)
-    canvas.drawRightString(doc.width + 0.5*inch, doc.height + 0.7*inch,
-                           "Departamento de Desarrollo Curricular y Calidad Académica")
+        canvas.restoreState()
+        canvas.endForm()
 
-    canvas.restoreState()
+    canvas.doForm(HEADER_FORM)